@@ -1,241 +1,667 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime, timedelta
-import requests
-from google.cloud import firestore
+import os
+import json
+import sys
+import time
+import importlib
+import threading
+import zlib
+from contextlib import contextmanager
+from collections import namedtuple
+from types import MappingProxyType
+from datetime import datetime, timedelta, timezone
+import snapshot as snapshots
+
+# Heavy modules (google.cloud.firestore, requests, pandas) are imported lazily via
+# lazy_import() on the screens that need them - pandas is only used by the admin log table.
 
 # --- 1. PAGE CONFIGURATION ---
 st.set_page_config(page_title="Last Man Standing", layout="centered")
 
-# --- 2. SECRETS & DATABASE SETUP ---
-try:
-    if "FOOTBALL_API_KEY" in st.secrets:
-        API_KEY = st.secrets["FOOTBALL_API_KEY"]
-    else:
-        st.error("Missing 'FOOTBALL_API_KEY' in secrets.toml")
-        st.stop()
+# --- STARTUP PROFILE ---
+# One record per process: how long each lazy import and one-off setup step took,
+# plus a breakdown of the first page render. Shown to admins in the sidebar.
+@st.cache_resource
+def startup_profile():
+    return {'started': datetime.now(), 'imports': {}, 'setup': {}, 'first_render': {}, 'first_render_done': False}
 
-    if "firebase" in st.secrets:
-        db = firestore.Client.from_service_account_info(st.secrets["firebase"])
-    else:
-        st.error("Missing [firebase] section in secrets.toml")
-        st.stop()
-    
-    # LOAD PASSWORDS
-    ADMIN_PASSWORD = st.secrets.get("ADMIN_PASSWORD", "admin123")
-    TREASURER_PASSWORD = st.secrets.get("TREASURER_PASSWORD", "money123")
-    
-except Exception as e:
-    st.error(f"Error connecting to secrets: {e}")
-    st.stop()
+@contextmanager
+def profiled(step, kind='first_render'):
+    prof = startup_profile()
+    if kind == 'first_render' and prof['first_render_done']:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        prof[kind][step] = prof[kind].get(step, 0) + (time.perf_counter() - t0) * 1000
 
+def lazy_import(module_name):
+    """Import a heavy module on first use and record how long it took"""
+    module = sys.modules.get(module_name)
+    if module is None:
+        with profiled(module_name, kind='imports'):
+            module = importlib.import_module(module_name)
+    return module
+
+# --- 2. SECRETS & DATABASE SETUP ---
 PL_COMPETITION_ID = 2021
+# Matchdays per season for football-data.org competitions; others default to 38 unless a league sets 'matchdays'
+COMPETITION_MATCHDAYS = {2021: 38, 2016: 46, 2014: 38, 2019: 38, 2002: 34, 2015: 34, 2003: 34, 2017: 34, 2013: 38}
 ENTRY_FEE = 10
+DEFAULT_LEAGUE_ID = "main"
+# Firestore free tier: 50k reads and 20k writes per day. The per-minute budgets catch spikes early.
+QUOTA_DEFAULTS = {'daily_reads': 50000, 'daily_writes': 20000, 'minute_reads': 1500, 'minute_writes': 500}
+# Where picks live: one doc per user per gameweek, consolidated pick sheets only, or both while migrating
+PICK_LAYOUTS = ('per_user', 'dual', 'consolidated')
+PICK_SHARDS = 8
 
-# --- 3. CUSTOM CSS ---
-def inject_custom_css():
-    st.markdown("""
-    <style>
-        @import url('https://fonts.googleapis.com/css2?family=Teko:wght@600;700&display=swap');
-        
-        /* 1. BACKGROUND */
-        [data-testid="stAppViewContainer"] {
-            background: linear-gradient(rgba(31, 0, 34, 0.85), rgba(31, 0, 34, 0.95)), 
-                        url('https://images.unsplash.com/photo-1693517393451-a71a593c9870?q=80&w=1770&auto=format&fit=crop') !important;
-            background-size: cover !important;
-            background-position: center !important;
-            background-attachment: fixed !important;
-            background-repeat: no-repeat !important;
-        }
-
-        /* 2. HEADERS & TEXT */
-        .hero-title {
-            font-family: 'Teko', sans-serif; font-size: 60px; font-weight: 700;
-            text-transform: uppercase; color: #ffffff; letter-spacing: 2px;
-            margin: 0; line-height: 1; text-align: center;
-            text-shadow: 0 0 10px rgba(0, 255, 135, 0.5);
+# --- LEAGUE NAMESPACES ---
+# The default league keeps the original root collections (players, picks, settings, logs).
+# Every other league lives under leagues/{league_id}/... with its own fee, competition and passwords.
+def build_leagues(league_secrets, admin_password, treasurer_password, auto_sweep=False,
+                  picks_layout='per_user', pick_shards=PICK_SHARDS):
+    leagues = {
+        DEFAULT_LEAGUE_ID: {
+            'id': DEFAULT_LEAGUE_ID,
+            'name': "Last Man Standing",
+            'competition_id': PL_COMPETITION_ID,
+            'matchdays': COMPETITION_MATCHDAYS[PL_COMPETITION_ID],
+            'entry_fee': ENTRY_FEE,
+            'admin_password': admin_password,
+            'treasurer_password': treasurer_password,
+            'auto_sweep': auto_sweep,
+            'picks_layout': picks_layout,
+            'pick_shards': pick_shards,
         }
-        .hero-subtitle {
-            font-family: 'Helvetica Neue', sans-serif; font-size: 14px;
-            color: #00ff87; text-transform: uppercase; letter-spacing: 3px;
-            margin-top: 5px; font-weight: 600; text-align: center; margin-bottom: 20px;
+    }
+    for league_id, cfg in league_secrets.items():
+        competition_id = int(cfg.get('competition_id', PL_COMPETITION_ID))
+        leagues[league_id] = {
+            'id': league_id,
+            'name': cfg.get('name', league_id),
+            'competition_id': competition_id,
+            'matchdays': int(cfg.get('matchdays', COMPETITION_MATCHDAYS.get(competition_id, 38))),
+            'entry_fee': cfg.get('entry_fee', ENTRY_FEE),
+            'admin_password': cfg.get('admin_password', admin_password),
+            'treasurer_password': cfg.get('treasurer_password', treasurer_password),
+            # Eliminate non-pickers automatically at first kickoff instead of via the Late Sweeper button
+            'auto_sweep': bool(cfg.get('auto_sweep', False)),
+            'picks_layout': cfg.get('picks_layout', 'per_user'),
+            # Fixed for a season - a user's shard is derived from it
+            'pick_shards': int(cfg.get('pick_shards', PICK_SHARDS)),
         }
-        h1, h2, h3, h4, h5, h6 { color: #ffffff !important; font-family: 'Helvetica Neue', sans-serif; text-transform: uppercase; letter-spacing: 1px; }
-        
-        p, label { color: #ffffff !important; }
+    for league in leagues.values():
+        if league['picks_layout'] not in PICK_LAYOUTS:
+            raise ValueError(f"Unknown picks_layout '{league['picks_layout']}' for league {league['id']} (use one of {', '.join(PICK_LAYOUTS)})")
+    return leagues
 
-        /* --- VERTICAL STACK LAYOUT --- */
-        .player-row-container {
-            display: flex; flex-direction: column; gap: 10px; margin-bottom: 30px;
-        }
-        
-        /* ACTIVE CARD STYLE */
-        .player-card {
-            background-color: #28002B; border: 1px solid rgba(0, 255, 135, 0.3); border-radius: 12px;
-            padding: 12px 20px; box-shadow: 0 4px 6px rgba(0,0,0,0.3); transition: transform 0.2s;
-            display: flex; align-items: center; justify-content: space-between; width: 100%;
-        }
-        .player-card:hover { transform: translateY(-2px); border-color: #00ff87; }
-
-        /* ELIMINATED CARD STYLE */
-        .player-card-eliminated {
-            background-color: #1a1a1a; 
-            border: 1px solid #444; 
-            border-radius: 12px;
-            padding: 10px 20px; 
-            display: flex; align-items: center; justify-content: space-between; width: 100%;
-            opacity: 0.8;
-        }
-        
-        /* NAME WRAPPING */
-        .pc-name { 
-            font-size: 16px; font-weight: 700; color: #fff; 
-            flex: 1; text-align: left;
-            white-space: normal !important;       
-            overflow-wrap: break-word !important; 
-            word-wrap: break-word !important;     
-            min-width: 0 !important;              
-            line-height: 1.2; 
-            padding-right: 10px; 
-        }
-        
-        .pc-center { flex: 0 0 100px; text-align: center; display: flex; flex-direction: column; align-items: center; justify-content: center; }
-        .pc-badge { width: 35px; height: 35px; object-fit: contain; filter: drop-shadow(0 2px 2px rgba(0,0,0,0.5)); }
-        
-        .status-tag-win { font-size: 10px; background: #00ff87; color: #1F0022; padding: 2px 6px; border-radius: 4px; font-weight: 800; margin-top: 4px; letter-spacing: 1px; }
-        .status-tag-loss { font-size: 10px; background: #ff4b4b; color: white; padding: 2px 6px; border-radius: 4px; font-weight: 800; margin-top: 4px; letter-spacing: 1px; }
-        
-        .pc-hidden { 
-            font-size: 24px; 
-            color: #ffffff !important; 
-        }
-        
-        .pc-team { font-size: 14px; color: #00ff87; font-weight: 600; flex: 1; text-align: right; text-transform: uppercase; }
-        .pc-eliminated-text { font-size: 12px; color: #ff4b4b; font-weight: 600; flex: 1; text-align: right; text-transform: uppercase; }
+@st.cache_resource
+def load_config():
+    """Read and validate secrets once per process (raises ValueError if something is missing)"""
+    with profiled('secrets', kind='setup'):
+        if "FOOTBALL_API_KEY" not in st.secrets:
+            raise ValueError("Missing 'FOOTBALL_API_KEY' in secrets.toml")
+        if "firebase" not in st.secrets:
+            raise ValueError("Missing [firebase] section in secrets.toml")
 
-        .match-card {
-            background-color: #28002B; border-radius: 12px; padding: 12px 10px;
-            margin-bottom: 15px; border: 1px solid rgba(255,255,255,0.05); box-shadow: 0 4px 6px rgba(0,0,0,0.3);
-            display: flex; flex-direction: column; 
-        }
-        .match-info-row { display: flex; align-items: center; justify-content: space-between; width: 100%; }
+        # LOAD PASSWORDS
+        admin_password = st.secrets.get("ADMIN_PASSWORD", "admin123")
+        treasurer_password = st.secrets.get("TREASURER_PASSWORD", "money123")
+        # OPTIONAL EXTRA LEAGUES: [leagues.<id>] tables in secrets.toml
+        league_secrets = {k: dict(v) for k, v in st.secrets.get("leagues", {}).items()}
 
-        .team-container { flex: 1; display: flex; align-items: center; font-weight: 700; color: white; font-size: 15px; min-width: 0; }
-        .team-container span { white-space: nowrap; overflow: hidden; text-overflow: ellipsis; width: 100%; }
-        .home-team { justify-content: flex-end; text-align: right; }
-        .away-team { justify-content: flex-start; text-align: left; }
-        .crest-img { width: 38px; height: 38px; object-fit: contain; margin: 0 10px; }
-        
-        .score-box { flex: 0 0 90px; text-align: center; background-color: #1F0022; border-radius: 8px; padding: 5px 0; }
-        .score-text { font-size: 18px; font-weight: 800; color: #00ff87; line-height: 1; }
-        .time-text { font-size: 16px; font-weight: 700; color: white; line-height: 1; }
-        .status-text { font-size: 9px; color: #ddd; text-transform: uppercase; margin-top: 5px; font-weight: 600; }
-        
-        div[data-testid="stMetric"] { background-color: #28002B !important; border-radius: 10px; padding: 10px !important; }
-        div[data-testid="stMetricLabel"] { color: #ffffff !important; }
-        div[data-testid="stMetricValue"] { color: #ffffff !important; }
-        
-        .streamlit-expanderHeader {
-            background-color: #28002B !important;
-            color: #ffffff !important;
-            font-weight: 800 !important;
-            border: 1px solid rgba(255,255,255,0.1) !important;
-            border-radius: 8px !important;
-        }
-        .streamlit-expanderHeader p { color: #ffffff !important; }
-        
-        div[role="radiogroup"] p { color: #ffffff !important; }
-        div[role="radiogroup"] > label > div:first-of-type {
-            background-color: #28002B !important;
-        }
-        
-        div[data-testid="stCaptionContainer"] { color: #ffffff !important; }
-        
-        .rollover-banner {
-            background-color: #ff4b4b; color: white; text-align: center;
-            padding: 15px; border-radius: 10px; margin-bottom: 20px;
-            font-family: 'Teko', sans-serif; font-size: 30px; font-weight: 700;
-            letter-spacing: 2px; box-shadow: 0 0 20px rgba(255, 75, 75, 0.6);
-            animation: pulse 2s infinite;
-        }
-        .banner-container {
-            text-align: center; padding: 20px; border-radius: 10px; margin-bottom: 20px;
-            box-shadow: 0 0 20px rgba(0,0,0,0.5); animation: pulse 2s infinite;
-        }
-        .banner-rollover { background-color: #ff4b4b; color: white; box-shadow: 0 0 20px rgba(255, 75, 75, 0.6); }
-        .banner-winner { background-color: #FFD700; color: #28002B; box-shadow: 0 0 20px rgba(255, 215, 0, 0.6); }
-        .banner-title { font-family: 'Teko', sans-serif; font-size: 36px; font-weight: 700; margin: 0; line-height: 1; }
-        .banner-subtitle { font-family: 'Helvetica Neue', sans-serif; font-size: 16px; font-weight: 600; margin-top: 5px; }
-        @keyframes pulse { 0% {transform:scale(1);} 50% {transform:scale(1.02);} 100% {transform:scale(1);} }
-        
-        .hero-container { text-align: center; margin-bottom: 30px; }
-        .hero-logo {
-            width: 200px; height: auto; margin-bottom: 15px;
-            filter: invert(1) drop-shadow(0 0 10px rgba(255,255,255,0.2));
-        }
-        
-        /* Regular buttons */
-        div.stButton > button {
-            background-color: #28002B !important; 
-            color: #ffffff !important; 
-            border: 1px solid #00ff87 !important;
-            font-weight: 700 !important;
-        }
-        div.stButton > button p { color: #ffffff !important; }
-        div.stButton > button:hover {
-            background-color: #00ff87 !important;
-            border-color: #28002B !important;
-        }
-        div.stButton > button:hover p { color: #28002B !important; }
-        div.stButton > button:active, div.stButton > button:focus {
-            background-color: #28002B !important; border-color: #00ff87 !important; box-shadow: none !important;
-        }
-        div.stButton > button:active p, div.stButton > button:focus p { color: #ffffff !important; }
-
-        /* Form submit button */
-        div.stFormSubmitButton > button {
-            background-color: #00ff87 !important; 
-            color: #28002B !important; 
-            border: 1px solid #00ff87 !important;
-            font-weight: 700 !important;
-        }
-        div.stFormSubmitButton > button p { color: #28002B !important; }
-        div.stFormSubmitButton > button:hover {
-            background-color: #28002B !important; color: #ffffff !important; border-color: #00ff87 !important;
-        }
-        div.stFormSubmitButton > button:hover p { color: #ffffff !important; }
-        div.stFormSubmitButton > button:active, div.stFormSubmitButton > button:focus {
-            background-color: #00ff87 !important; color: #28002B !important; border-color: #00ff87 !important; box-shadow: none !important;
+        return {
+            'api_key': st.secrets["FOOTBALL_API_KEY"],
+            # Point at a stub server for load tests
+            'api_url': st.secrets.get("FOOTBALL_API_URL", "https://api.football-data.org/v4").rstrip("/"),
+            'firebase': dict(st.secrets["firebase"]),
+            'leagues': build_leagues(league_secrets, admin_password, treasurer_password, bool(st.secrets.get("AUTO_SWEEP", False)),
+                                     st.secrets.get("PICKS_LAYOUT", 'per_user'), int(st.secrets.get("PICK_SHARDS", PICK_SHARDS))),
+            'scheduler_enabled': bool(st.secrets.get("SCHEDULER_ENABLED", True)),
+            'scheduler_state_path': st.secrets.get("SCHEDULER_STATE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".scheduler_state.json")),
+            'quota_state_path': st.secrets.get("QUOTA_STATE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".quota_state.json")),
+            # OPTIONAL [quota] table: daily_reads, daily_writes, minute_reads, minute_writes
+            'quota': {**QUOTA_DEFAULTS, **{k: int(v) for k, v in st.secrets.get("quota", {}).items()}},
         }
-        div.stFormSubmitButton > button:active p, div.stFormSubmitButton > button:focus p { color: #28002B !important; }
-        
-        @media (max-width: 600px) {
-            .team-container { font-size: 12px; }
-            .crest-img { width: 25px; height: 25px; margin: 0 5px; }
-            .hero-title { font-size: 40px; }
+
+@st.cache_resource
+def get_db():
+    """One Firestore client per process, built on first use"""
+    firestore = lazy_import('google.cloud.firestore')
+    with profiled('firestore_client', kind='setup'):
+        return firestore.Client.from_service_account_info(load_config()['firebase'])
+
+try:
+    CONFIG = load_config()
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
+except Exception as e:
+    st.error(f"Error connecting to secrets: {e}")
+    st.stop()
+
+API_KEY = CONFIG['api_key']
+FOOTBALL_API_URL = CONFIG['api_url']
+LEAGUES = CONFIG['leagues']
+
+def league_col(league_id, name):
+    """Metered collection reference for a league ('players', 'picks', 'pick_sheets', 'settings', 'logs' or 'backups')"""
+    db = get_db()
+    if league_id == DEFAULT_LEAGUE_ID:
+        return Metered(db.collection(name))
+    return Metered(db.collection('leagues').document(league_id).collection(name))
+
+# --- FIRESTORE QUOTA GOVERNOR ---
+# Every read and write made through league_col() is charged against daily and per-minute budgets
+# (per process). As usage climbs the app degrades step by step instead of running dry mid-afternoon:
+#   CONSERVE  cache TTLs x4, visit logging paused
+#   SNAPSHOT  cache TTLs x10, spectators get the last good snapshot with no reads at all
+#   CRITICAL  cache TTLs x30, activity log viewer off, only pick/admin actions are logged
+# The daily budget resets at midnight Pacific, like Firestore's own quota.
+# Levels go up as soon as a threshold is crossed but only come down one step at a time, after
+# QUOTA_LEVEL_HOLD and once usage is QUOTA_HYSTERESIS below the threshold - so the per-minute
+# counters resetting mid-rush can't flip the app between levels (and cache lifetimes) every minute.
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+except Exception:
+    QUOTA_TZ = timezone(timedelta(hours=-8))
+
+QUOTA_LEVELS = [
+    # (usage threshold, name, cache TTL multiplier)
+    (0.0, 'NORMAL', 1),
+    (0.6, 'CONSERVE', 4),
+    (0.8, 'SNAPSHOT', 10),
+    (0.95, 'CRITICAL', 30),
+]
+QUOTA_LEVEL_HOLD = timedelta(minutes=10)
+QUOTA_SAVE_INTERVAL = timedelta(seconds=30)
+QUOTA_SYNC_INTERVAL = timedelta(minutes=5)
+QUOTA_HYSTERESIS = 0.1
+ESSENTIAL_LOG_ACTIONS = {'CLICKED_SUBMIT', 'SUCCESS', 'ALREADY_PICKED', 'ERROR', 'FORCE_PICK', 'AUTO_SWEEP', 'RESET'}
+
+class DataUnavailable(Exception):
+    """Firestore couldn't be read - as opposed to a collection that is genuinely empty"""
+
+# The daily tally is saved to a local file every QUOTA_SAVE_INTERVAL, which covers a process restart
+# inside the same container. A fresh container (scale to zero, redeploy) starts without that file, so the
+# tally is also mirrored to the project-wide quota/tally doc every QUOTA_SYNC_INTERVAL - at most a few
+# hundred writes a day. On start the larger of the two tallies for today wins.
+def _quota_tally_ref():
+    return get_db().collection('quota').document('tally')
+
+def _read_quota_tally(today):
+    saved = []
+    try:
+        with open(CONFIG['quota_state_path'], encoding="utf-8") as f:
+            saved.append(json.load(f))
+    except (OSError, ValueError):
+        pass
+    try:
+        doc = _quota_tally_ref().get()
+        if doc.exists:
+            saved.append(doc.to_dict())
+    except Exception:
+        pass
+    saved = [s for s in saved if isinstance(s, dict) and s.get('day') == today.isoformat()]
+    return max(saved, key=lambda s: s['daily']['reads'] + s['daily']['writes'], default=None)
+
+@st.cache_resource
+def _quota_governor():
+    now = datetime.now(QUOTA_TZ)
+    gov = {'lock': threading.Lock(), 'day': None, 'minute': None,
+           'daily': {'reads': 0, 'writes': 0}, 'per_minute': {'reads': 0, 'writes': 0},
+           'last_minute': {'reads': 0, 'writes': 0}, 'exhausted_day': None, 'level': 0, 'level_since': None,
+           'saved_at': now, 'synced_at': now}
+    try:
+        saved = _read_quota_tally(now.date())
+        if saved:
+            gov['day'] = now.date()
+            # +1 for the tally doc read just now
+            gov['daily'] = {'reads': int(saved['daily']['reads']) + 1, 'writes': int(saved['daily']['writes'])}
+            gov['exhausted_day'] = gov['day'] if saved.get('exhausted') else None
+            gov['level'], gov['level_since'] = int(saved['level']), datetime.fromisoformat(saved['level_since'])
+    except (ValueError, KeyError, TypeError):
+        pass
+    return gov
+
+def _save_quota_tally(gov, now, sync=False):
+    """Called with gov['lock'] held. Returns the tally to mirror to Firestore (outside the lock) when sync is due."""
+    gov['saved_at'] = now
+    sync = sync or now - gov['synced_at'] >= QUOTA_SYNC_INTERVAL
+    if sync:
+        gov['synced_at'] = now
+        gov['daily']['writes'] += 1
+    state = {'day': gov['day'].isoformat(), 'daily': dict(gov['daily']), 'exhausted': gov['exhausted_day'] is not None,
+             'level': gov['level'], 'level_since': (gov['level_since'] or now).isoformat()}
+    try:
+        tmp_path = f"{CONFIG['quota_state_path']}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, CONFIG['quota_state_path'])
+    except OSError:
+        pass
+    return state if sync else None
+
+def _sync_quota_tally(state):
+    if state is None:
+        return
+    try:
+        _quota_tally_ref().set(state)
+    except Exception:
+        # Out of quota or offline - the local file still has it and the next sync will try again
+        pass
+
+def _roll_quota_windows(gov, now):
+    if gov['day'] != now.date():
+        gov['day'], gov['daily'], gov['exhausted_day'] = now.date(), {'reads': 0, 'writes': 0}, None
+    minute = now.replace(second=0, microsecond=0)
+    if gov['minute'] != minute:
+        # Keep the previous minute so the per-minute rate doesn't read as zero at the top of every minute
+        follows = gov['minute'] is not None and minute - gov['minute'] == timedelta(minutes=1)
+        gov['last_minute'] = gov['per_minute'] if follows else {'reads': 0, 'writes': 0}
+        gov['minute'], gov['per_minute'] = minute, {'reads': 0, 'writes': 0}
+
+def charge_quota(reads=0, writes=0):
+    gov = _quota_governor()
+    now = datetime.now(QUOTA_TZ)
+    with gov['lock']:
+        _roll_quota_windows(gov, now)
+        gov['daily']['reads'] += reads
+        gov['daily']['writes'] += writes
+        gov['per_minute']['reads'] += reads
+        gov['per_minute']['writes'] += writes
+        sync = _save_quota_tally(gov, now) if now - gov['saved_at'] >= QUOTA_SAVE_INTERVAL else None
+    _sync_quota_tally(sync)
+
+def note_firestore_error(e):
+    """Firestore said the quota is gone - go straight to CRITICAL until the daily reset"""
+    if type(e).__name__ in ['ResourceExhausted', 'TooManyRequests']:
+        gov = _quota_governor()
+        now = datetime.now(QUOTA_TZ)
+        with gov['lock']:
+            _roll_quota_windows(gov, now)
+            gov['exhausted_day'] = now.date()
+            sync = _save_quota_tally(gov, now, sync=True)
+        _sync_quota_tally(sync)
+
+def quota_status():
+    gov = _quota_governor()
+    budgets = CONFIG['quota']
+    now = datetime.now(QUOTA_TZ)
+    with gov['lock']:
+        _roll_quota_windows(gov, now)
+        usage = {
+            'daily_reads': gov['daily']['reads'], 'daily_writes': gov['daily']['writes'],
+            'minute_reads': max(gov['per_minute']['reads'], gov['last_minute']['reads']),
+            'minute_writes': max(gov['per_minute']['writes'], gov['last_minute']['writes']),
         }
-    </style>
-    """, unsafe_allow_html=True)
+        exhausted = gov['exhausted_day'] is not None
+        ratio = 1.0 if exhausted else max(usage[k] / budgets[k] for k in usage if budgets.get(k))
+        target = max(i for i, (threshold, _, _) in enumerate(QUOTA_LEVELS) if ratio >= threshold)
+        if target > gov['level']:
+            gov['level'], gov['level_since'] = target, now
+        elif (target < gov['level'] and now - gov['level_since'] >= QUOTA_LEVEL_HOLD
+              and ratio < QUOTA_LEVELS[gov['level']][0] - QUOTA_HYSTERESIS):
+            gov['level'], gov['level_since'] = gov['level'] - 1, now
+        level = gov['level']
+    _, name, ttl_multiplier = QUOTA_LEVELS[level]
+    return {
+        'level': level,
+        'name': name,
+        'ratio': ratio,
+        'usage': usage,
+        'budgets': budgets,
+        'exhausted': exhausted,
+        'ttl_multiplier': ttl_multiplier,
+        'snapshot_only': level >= 2,
+    }
+
+def cache_ttl(base_ttl):
+    """Seconds cached league data may be served before it is refetched - stretched while the governor is conserving"""
+    return base_ttl * quota_status()['ttl_multiplier']
+
+class Metered:
+    """Wraps a Firestore collection, document or query and charges its reads and writes to the governor"""
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def collection(self, name): return Metered(self.raw.collection(name))
+    def document(self, *args): return Metered(self.raw.document(*args))
+    def where(self, *args, **kwargs): return Metered(self.raw.where(*args, **kwargs))
+    def order_by(self, *args, **kwargs): return Metered(self.raw.order_by(*args, **kwargs))
+    def limit(self, count): return Metered(self.raw.limit(count))
+    def start_after(self, cursor): return Metered(self.raw.start_after(cursor))
+
+    def stream(self, *args, **kwargs):
+        count = 0
+        try:
+            for doc in self.raw.stream(*args, **kwargs):
+                count += 1
+                yield doc
+        except Exception as e:
+            note_firestore_error(e)
+            raise
+        finally:
+            # A query that matches nothing is still billed as one read
+            charge_quota(reads=max(count, 1))
+
+    def get(self, *args, **kwargs):
+        try:
+            result = self.raw.get(*args, **kwargs)
+        except Exception as e:
+            note_firestore_error(e)
+            raise
+        charge_quota(reads=max(len(result), 1) if isinstance(result, list) else 1)
+        return result
+
+    def _write(self, method, *args, **kwargs):
+        try:
+            result = getattr(self.raw, method)(*args, **kwargs)
+        except Exception as e:
+            note_firestore_error(e)
+            raise
+        charge_quota(writes=1)
+        return result
+
+    def set(self, *args, **kwargs): return self._write('set', *args, **kwargs)
+    def update(self, *args, **kwargs): return self._write('update', *args, **kwargs)
+    def delete(self, *args, **kwargs): return self._write('delete', *args, **kwargs)
+    def add(self, *args, **kwargs): return self._write('add', *args, **kwargs)
+
+# --- PER-LEAGUE CACHE VERSIONS ---
+# Cached league data is keyed on a version number. Bumping it invalidates one league
+# without throwing away the fixture cache that every league on the competition shares.
+# Player histories get their own (league_id, name) versions so one pick doesn't flush them all.
+@st.cache_resource
+def _league_versions():
+    return {'lock': threading.Lock(), 'versions': {}}
+
+def _bump_version(key):
+    store = _league_versions()
+    with store['lock']:
+        store['versions'][key] = store['versions'].get(key, 0) + 1
+
+def data_version(league_id):
+    return _league_versions()['versions'].get(league_id, 0)
+
+def invalidate_league(league_id):
+    _bump_version(league_id)
+
+def player_version(league_id, name):
+    return _league_versions()['versions'].get((league_id, name), 0)
+
+def invalidate_player(league_id, name):
+    _bump_version((league_id, name))
+
+# Loaders also take a refresh generation, bumped only when a cached copy has outlived cache_ttl()
+# - so changing quota level never changes a cache key and forces a reload by itself.
+def refresh_generation(league_id):
+    return _league_versions()['versions'].get(('refresh', league_id), 0)
+
+def expire_league(league_id, seen_generation):
+    """Move past a stale generation - once, however many sessions notice it at the same time"""
+    store = _league_versions()
+    key = ('refresh', league_id)
+    with store['lock']:
+        if store['versions'].get(key, 0) == seen_generation:
+            store['versions'][key] = seen_generation + 1
+        return store['versions'][key]
+
+def fixtures_version(competition_id):
+    return _league_versions()['versions'].get(('fixtures', competition_id), 0)
+
+def invalidate_fixtures(competition_id):
+    """Force a fresh football-data fetch for a competition (used when a match should have finished)"""
+    _bump_version(('fixtures', competition_id))
+
+# --- 3. CUSTOM CSS ---
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "screen.css")
+
+@st.cache_resource
+def load_css():
+    with open(CSS_PATH, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+def inject_custom_css():
+    st.markdown(load_css(), unsafe_allow_html=True)
 
 # --- 4. HELPER FUNCTIONS ---
-@st.cache_data(ttl=60)
-def get_all_players_full():
-    """Fetch FULL player objects (name, status, eliminated_gw, paid)"""
+# --- LEAGUE STATE SNAPSHOT ---
+# Firestore docs are turned into immutable, slotted records once per data version and
+# shared across every session via st.cache_resource - nothing downstream may mutate them.
+Player = namedtuple('Player', 'name status paid eliminated_gw used_teams')
+Pick = namedtuple('Pick', 'user team matchday result timestamp')
+
+class LeagueState(namedtuple('LeagueState', [
+        'league_id', 'gw', 'version', 'loaded_at', 'fingerprint', 'players', 'picks',
+        'by_name', 'by_status', 'pick_by_user', 'users_by_team', 'paid_count'])):
+    """Read-only view of one league for one gameweek, with its lookups precomputed"""
+    __slots__ = ()
+
+    def with_status(self, *statuses):
+        return tuple(p for s in statuses for p in self.by_status.get(s, ()))
+
+def _freeze_index(index):
+    return MappingProxyType({k: tuple(v) for k, v in index.items()})
+
+# --- PICK STORAGE ---
+# 'per_user':     picks/{user}_GW{gw} - loading a gameweek costs one read per entrant.
+# 'consolidated': pick_sheets/GW{gw}_{shard} = {'matchday', 'shard', 'picks': {user: {team, timestamp, result}}}.
+#                 A gameweek loads in pick_shards reads; users are spread across shards to stay far below the
+#                 1 MiB document limit and Firestore's ~1 sustained write/sec per document at the deadline.
+# 'dual':         writes both but still reads and checks the per-user docs, so it is safe to switch on before the
+#                 sheets are built. Run migrate_picks_to_sheets() while in it, then switch to 'consolidated'.
+def picks_layout(league_id):
+    return LEAGUES[league_id]['picks_layout']
+
+def pick_shard(league_id, user):
+    return zlib.crc32(user.encode('utf-8')) % LEAGUES[league_id]['pick_shards']
+
+def pick_doc(league_id, user, gw):
+    return league_col(league_id, 'picks').document(f"{user}_GW{gw}")
+
+def pick_sheet(league_id, gw, shard):
+    return league_col(league_id, 'pick_sheets').document(f"GW{gw}_{shard}")
+
+def read_picks_for_gw(league_id, gw):
+    if picks_layout(league_id) != 'consolidated':
+        docs = league_col(league_id, 'picks').where('matchday', '==', gw).stream()
+        rows = ((d['user'], d) for d in (doc.to_dict() for doc in docs) if d.get('user'))
+    else:
+        sheets = league_col(league_id, 'pick_sheets').where('matchday', '==', gw).stream()
+        rows = (row for sheet in sheets for row in (sheet.to_dict().get('picks') or {}).items())
+    return tuple(Pick(user, d.get('team'), d.get('matchday', gw), d.get('result'), d.get('timestamp')) for user, d in rows)
+
+def _pick_writes(league_id, user, gw, fields):
+    """(ref, data) pairs that put `fields` onto a user's pick in every place the layout keeps it - all merge writes"""
+    layout = picks_layout(league_id)
+    writes = []
+    if layout != 'consolidated':
+        writes.append((pick_doc(league_id, user, gw), {'user': user, 'matchday': gw, **fields}))
+    if layout != 'per_user':
+        shard = pick_shard(league_id, user)
+        writes.append((pick_sheet(league_id, gw, shard), {'matchday': gw, 'shard': shard, 'picks': {user: fields}}))
+    return writes
+
+def write_pick(league_id, user, gw, fields):
+    for ref, data in _pick_writes(league_id, user, gw, fields):
+        ref.set(data, merge=True)
+
+def _submit_pick(transaction, league_id, user, team, gw):
+    # The existence check and the writes commit together, so a double submit can never leave two picks
+    # In 'dual' both places are checked, so a pick found in either one blocks a second
+    layout = picks_layout(league_id)
+    taken = False
+    if layout != 'consolidated':
+        taken = pick_doc(league_id, user, gw).raw.get(transaction=transaction).exists
+    if layout != 'per_user':
+        sheet = pick_sheet(league_id, gw, pick_shard(league_id, user)).raw.get(transaction=transaction)
+        taken = taken or (sheet.exists and user in (sheet.to_dict().get('picks') or {}))
+    if taken:
+        return False
+    firestore = lazy_import('google.cloud.firestore')
+    for ref, data in _pick_writes(league_id, user, gw, {'team': team, 'timestamp': datetime.now(), 'result': 'PENDING'}):
+        transaction.set(ref.raw, data, merge=True)
+    # FIXED: Removed 'paid': False to prevent overwriting payment status
+    player_ref = league_col(league_id, 'players').document(user).raw
+    transaction.set(player_ref, {'name': user, 'used_teams': firestore.ArrayUnion([team]), 'status': 'active'}, merge=True)
+    return True
+
+def submit_pick(league_id, user, team, gw):
+    """Record a pick and mark the team used, in one transaction. Returns False if the user had already picked."""
+    firestore = lazy_import('google.cloud.firestore')
     try:
-        docs = db.collection('players').stream()
-        return [doc.to_dict() for doc in docs]
-    except: return []
+        saved = firestore.transactional(_submit_pick)(get_db().transaction(), league_id, user, team, gw)
+    except Exception as e:
+        note_firestore_error(e)
+        raise
+    writes = len(_pick_writes(league_id, user, gw, {}))
+    charge_quota(reads=1 + (picks_layout(league_id) == 'dual'), writes=writes + 1 if saved else 0)
+    return saved
 
-@st.cache_data(ttl=60)
-def get_all_picks_for_gw(gw):
-    try: return [p.to_dict() for p in db.collection('picks').where('matchday', '==', gw).stream()]
-    except: return []
+def migrate_picks_to_sheets(league_id):
+    """Copy every per-user pick doc into the pick sheets. Safe to re-run. Returns the number of picks copied.
+    Only runs in 'dual': anywhere else new picks stop reaching one of the two layouts, so the sheets would
+    be stale the moment the copy finished."""
+    if picks_layout(league_id) != 'dual':
+        raise ValueError(f"Switch league {league_id} to picks_layout 'dual' before building pick sheets")
+    sheets = {}
+    for doc in league_col(league_id, 'picks').stream():
+        d = doc.to_dict()
+        if not d.get('user') or d.get('matchday') is None: continue
+        entry = {k: d[k] for k in ('team', 'timestamp', 'result') if k in d}
+        sheets.setdefault((d['matchday'], pick_shard(league_id, d['user'])), {})[d['user']] = entry
+
+    db = get_db()
+    items = list(sheets.items())
+    for i in range(0, len(items), snapshots.BATCH_SIZE):
+        batch = db.batch()
+        for (gw, shard), picks in items[i:i + snapshots.BATCH_SIZE]:
+            batch.set(pick_sheet(league_id, gw, shard).raw, {'matchday': gw, 'shard': shard, 'picks': picks}, merge=True)
+        batch.commit()
+    charge_quota(writes=len(items))
+    invalidate_league(league_id)
+    return sum(len(picks) for picks in sheets.values())
+
+LEAGUE_TTL = 60
+
+@st.cache_resource(ttl=3600, max_entries=200)
+def get_all_players_full(league_id, version, generation):
+    """Fetch FULL player records (name, status, eliminated_gw, paid), sorted by name"""
+    try:
+        docs = league_col(league_id, 'players').stream()
+        players = []
+        for doc in docs:
+            d = doc.to_dict()
+            players.append(Player(
+                name=d.get('name', doc.id),
+                status=d.get('status'),
+                paid=d.get('paid', False),
+                eliminated_gw=d.get('eliminated_gw'),
+                used_teams=tuple(d.get('used_teams') or ()),
+            ))
+        return tuple(sorted(players, key=lambda p: p.name))
+    except Exception as e:
+        raise DataUnavailable(f"players: {e}") from e
+
+@st.cache_resource(ttl=3600, max_entries=200)
+def get_all_picks_for_gw(league_id, gw, version, generation):
+    try:
+        return read_picks_for_gw(league_id, gw)
+    except Exception as e:
+        raise DataUnavailable(f"picks: {e}") from e
+
+@st.cache_resource(ttl=3600, max_entries=200)
+def get_league_state(league_id, gw, version, generation):
+    players = get_all_players_full(league_id, version, generation)
+    picks = get_all_picks_for_gw(league_id, gw, version, generation)
+
+    by_status, users_by_team = {}, {}
+    for p in players:
+        by_status.setdefault(p.status, []).append(p)
+    for pk in picks:
+        users_by_team.setdefault(pk.team, []).append(pk.user)
+
+    return LeagueState(
+        league_id=league_id,
+        gw=gw,
+        version=version,
+        loaded_at=datetime.now(),
+        # Same players and picks, same fingerprint - however many times they were reloaded
+        fingerprint=hash((players, picks)),
+        players=players,
+        picks=picks,
+        by_name=MappingProxyType({p.name: p for p in players}),
+        by_status=_freeze_index(by_status),
+        pick_by_user=MappingProxyType({pk.user: pk for pk in picks}),
+        users_by_team=_freeze_index(users_by_team),
+        paid_count=sum(1 for p in players if p.paid),
+    )
+
+@st.cache_resource
+def _last_good_states():
+    return {}
+
+def league_players(league_id):
+    return get_all_players_full(league_id, data_version(league_id), refresh_generation(league_id))
+
+def league_state(league_id, gw):
+    """Current LeagueState for a gameweek (raises DataUnavailable). Successful loads are kept as the
+    last good snapshot for spectators in SNAPSHOT mode and for when Firestore is unreachable."""
+    version, generation = data_version(league_id), refresh_generation(league_id)
+    state = get_league_state(league_id, gw, version, generation)
+    if (datetime.now() - state.loaded_at).total_seconds() > cache_ttl(LEAGUE_TTL):
+        state = get_league_state(league_id, gw, version, expire_league(league_id, generation))
+    _last_good_states()[(league_id, gw)] = state
+    return state
+
+def last_good_state(league_id, gw):
+    return _last_good_states().get((league_id, gw))
+
+def league_settings(league_id):
+    last_good = _last_good_states()
+    try:
+        settings = get_game_settings(league_id, data_version(league_id))
+    except DataUnavailable:
+        if (league_id, 'settings') in last_good: return last_good[(league_id, 'settings')]
+        raise
+    last_good[(league_id, 'settings')] = settings
+    return settings
+
+# --- PLAYER PICK HISTORY ---
+# One query on the (user, matchday) composite index - see firestore.indexes.json.
+# Consolidated leagues read the player's shard of each gameweek's sheet instead.
+@st.cache_resource(ttl=3600, max_entries=500)
+def get_player_history(league_id, name, version):
+    try:
+        if picks_layout(league_id) == 'consolidated':
+            sheets = league_col(league_id, 'pick_sheets').where('shard', '==', pick_shard(league_id, name)).stream()
+            rows = [(s['matchday'], s['picks'][name]) for s in (sheet.to_dict() for sheet in sheets) if name in s.get('picks', {})]
+        else:
+            docs = league_col(league_id, 'picks').where('user', '==', name).order_by('matchday').stream()
+            rows = [(d.get('matchday'), d) for d in (doc.to_dict() for doc in docs)]
+    except Exception as e:
+        raise DataUnavailable(f"history: {e}") from e
+    history = [Pick(name, d.get('team'), gw, d.get('result'), d.get('timestamp')) for gw, d in rows]
+    return tuple(sorted(history, key=lambda p: p.matchday))
 
 # --- AUDIT LOGGING FUNCTION ---
-def log_attempt(user, action, details):
+def log_attempt(league_id, user, action, details):
     """Log any attempt (successful or failed) to Firestore for audit trail"""
+    # Save writes while the quota governor is conserving - pick outcomes and admin actions always get logged
+    level = quota_status()['level']
+    if action not in ESSENTIAL_LOG_ACTIONS and (level >= 3 or (level >= 1 and action == "VISIT")):
+        return
     try:
-        db.collection('logs').add({
+        league_col(league_id, 'logs').add({
             'timestamp': datetime.now(),
             'user': user,
             'action': action,
@@ -244,30 +670,65 @@ def log_attempt(user, action, details):
     except:
         pass # Don't crash app if logging fails
 
+# --- SHARED FIXTURE CACHE (ONE PER COMPETITION, NOT PER LEAGUE) ---
+@st.cache_data(ttl=300)
+def get_scheduled_matches(competition_id, version):
+    requests = lazy_import('requests')
+    headers = {'X-Auth-Token': API_KEY}
+    r = requests.get(f"{FOOTBALL_API_URL}/competitions/{competition_id}/matches?status=SCHEDULED", headers=headers)
+    return r.json().get('matches', [])
+
+def fetch_matches_for_gameweek(competition_id, gw):
+    requests = lazy_import('requests')
+    headers = {'X-Auth-Token': API_KEY}
+    try:
+        r = requests.get(f"{FOOTBALL_API_URL}/competitions/{competition_id}/matches?matchday={gw}", headers=headers)
+        return r.json()['matches']
+    except: return []
+
+# Match dicts are straight from the API and shared between sessions - treat them as read-only
+Matchday = namedtuple('Matchday', 'competition_id gw matches team_results crest_map teams')
+
+@st.cache_resource(ttl=600, max_entries=200)
+def get_matchday(competition_id, gw, version):
+    matches = tuple(fetch_matches_for_gameweek(competition_id, gw))
+    crest_map = {}
+    for m in matches:
+        crest_map[m['homeTeam']['name']] = m['homeTeam']['crest']
+        crest_map[m['awayTeam']['name']] = m['awayTeam']['crest']
+    return Matchday(
+        competition_id=competition_id,
+        gw=gw,
+        matches=matches,
+        team_results=MappingProxyType(calculate_team_results(matches)),
+        crest_map=MappingProxyType(crest_map),
+        teams=frozenset(crest_map),
+    )
+
 # --- SMART GAMEWEEK CALCULATION ---
 @st.cache_data(ttl=300) 
-def get_current_gameweek_from_api():
-    headers = {'X-Auth-Token': API_KEY}
+def get_current_gameweek_from_api(league_id, version):
+    competition_id = LEAGUES[league_id]['competition_id']
     try:
         # 1. Ask API for the "Scheduled" matches
-        r = requests.get(f"https://api.football-data.org/v4/competitions/{PL_COMPETITION_ID}/matches?status=SCHEDULED", headers=headers)
-        data = r.json()
+        scheduled = get_scheduled_matches(competition_id, fixtures_version(competition_id))
         
-        if not data.get('matches'): return 38
+        if not scheduled: return LEAGUES[league_id]['matchdays']
         
         # API says this is the upcoming GW (e.g. 17)
-        api_gw = data['matches'][0]['matchday']
+        api_gw = scheduled[0]['matchday']
         
         # 2. Check PREVIOUS GW (e.g. 16)
         prev_gw = api_gw - 1
         if prev_gw < 1: return api_gw
         
         # Check picks for PREVIOUS GW (16)
-        picks_docs_prev = db.collection('picks').where('matchday', '==', prev_gw).stream()
-        picked_teams_prev = {doc.to_dict().get('team') for doc in picks_docs_prev}
-        
-        matches_prev = get_matches_for_gameweek(prev_gw)
-        
+        matches_prev = get_matchday(competition_id, prev_gw, fixtures_version(competition_id)).matches
+        try:
+            picked_teams_prev = set(league_state(league_id, prev_gw).users_by_team)
+        except DataUnavailable:
+            # Can't see last week's picks - assume every match still matters rather than guess
+            picked_teams_prev = {m[side]['name'] for m in matches_prev for side in ['homeTeam', 'awayTeam']}
         # Are there any relevant matches left in GW16?
         relevant_matches_prev = []
         for m in matches_prev:
@@ -299,14 +760,6 @@ def get_current_gameweek_from_api():
         print(f"Error in GW logic: {e}")
         return 15 # Default fallback
 
-@st.cache_data(ttl=600)
-def get_matches_for_gameweek(gw):
-    headers = {'X-Auth-Token': API_KEY}
-    try:
-        r = requests.get(f"https://api.football-data.org/v4/competitions/{PL_COMPETITION_ID}/matches?matchday={gw}", headers=headers)
-        return r.json()['matches']
-    except: return []
-
 def format_deadline_date(dt):
     day = dt.day
     if 4 <= day <= 20 or 24 <= day <= 30: suffix = "th"
@@ -331,148 +784,310 @@ def calculate_team_results(matches):
     return results
 
 @st.cache_data(ttl=600)
-def get_game_settings():
-    doc = db.collection('settings').document('config').get()
+def get_game_settings(league_id, version):
+    try:
+        doc = league_col(league_id, 'settings').document('config').get()
+    except Exception as e:
+        raise DataUnavailable(f"settings: {e}") from e
     return doc.to_dict() if doc.exists else {'rollover_multiplier': 1}
 
-def update_game_settings(multiplier):
-    db.collection('settings').document('config').set({'rollover_multiplier': multiplier})
+def update_game_settings(league_id, multiplier):
+    league_col(league_id, 'settings').document('config').set({'rollover_multiplier': multiplier})
 
 # --- AUTO ELIMINATION LOGIC ---
-def auto_process_eliminations(current_gw, matches):
-    # ONLY CHECK CURRENT WEEK TO AVOID "GHOST" ELIMINATIONS FROM PAST WEEKS
-    team_results = calculate_team_results(matches)
-    picks = get_all_picks_for_gw(current_gw)
+def write_back_results(state, team_results):
+    """Put each settled team's result onto its pickers' picks. Returns the number of picks updated."""
+    written = 0
+    for team, users in state.users_by_team.items():
+        result = team_results.get(team, 'PENDING')
+        if result == 'PENDING': continue
+        for user in users:
+            # SETTLED: WRITE THE RESULT BACK ONTO THE PICK (ONCE) SO PLAYER HISTORY NEEDS NO FIXTURE LOOKUPS
+            if state.pick_by_user[user].result != result:
+                write_pick(state.league_id, user, state.gw, {'result': result})
+                invalidate_player(state.league_id, user)
+                written += 1
+    return written
+
+def settle_gameweek(state, matchday):
+    """Write back finished results and eliminate losers for one gameweek. Returns True if anyone was eliminated.
+    Runs from the scheduler as each match settles; page views only catch what it hasn't done yet."""
     updates_made = False
+    results_written = write_back_results(state, matchday.team_results)
     
-    for p in picks:
-        user = p.get('user')
-        team = p.get('team')
-        if not user or not team: continue 
-
-        result = team_results.get(team, 'PENDING')
-        
-        if result == 'LOSE':
-            player_ref = db.collection('players').document(user)
-            player_data = player_ref.get()
-            
-            if player_data.exists:
-                current_status = player_data.to_dict().get('status')
-                if current_status == 'active':
-                    player_ref.update({'status': 'eliminated', 'eliminated_gw': current_gw})
-                    updates_made = True
+    for team, users in state.users_by_team.items():
+        if matchday.team_results.get(team) != 'LOSE': continue
+        for user in users:
+            player = state.by_name.get(user)
+            if player and player.status == 'active':
+                league_col(state.league_id, 'players').document(user).update({'status': 'eliminated', 'eliminated_gw': state.gw})
+                updates_made = True
     
-    if updates_made:
-        st.cache_data.clear()
+    if updates_made or results_written:
+        invalidate_league(state.league_id)
+    return updates_made
+
+def backfill_results(league_id, before_gw):
+    """One-off: write results onto the picks of every gameweek before before_gw, for picks settled before results
+    were written back. Results only - those gameweeks' eliminations were handled at the time. Safe to re-run.
+    Returns (picks updated, gameweeks football-data returned nothing for)."""
+    competition_id = LEAGUES[league_id]['competition_id']
+    written, missing = 0, []
+    for gw in range(1, before_gw):
+        # Straight from the API: the shared fixture cache would hold on to an empty (rate-limited) answer
+        matches = fetch_matches_for_gameweek(competition_id, gw)
+        if not matches:
+            missing.append(gw)
+            continue
+        state = get_league_state(league_id, gw, data_version(league_id), refresh_generation(league_id))
+        written += write_back_results(state, calculate_team_results(matches))
+    if written:
+        invalidate_league(league_id)
+    return written, missing
+
+def auto_process_eliminations(state, matchday):
+    # ONLY CHECK CURRENT WEEK TO AVOID "GHOST" ELIMINATIONS FROM PAST WEEKS
+    if settle_gameweek(state, matchday):
         st.rerun()
 
-def admin_reset_game(current_gw, is_rollover=False):
-    docs = db.collection('players').stream()
+def sweep_non_pickers(state):
+    """Eliminate everyone still in the game with no pick for state.gw. Returns the names eliminated."""
+    swept = []
+    for pl in state.with_status('active', 'pending'):
+        if pl.name not in state.pick_by_user:
+            league_col(state.league_id, 'players').document(pl.name).update({
+                'status': 'eliminated',
+                'eliminated_gw': state.gw
+            })
+            swept.append(pl.name)
+    if swept:
+        invalidate_league(state.league_id)
+    return swept
+
+# --- BACKUPS ---
+# Compressed league snapshots (see snapshot.py) kept in the league's own 'backups' collection:
+# a small metadata doc per backup, with the bytes split across backups/{id}/chunks so size never
+# stops a backup being kept. Restore one with: python snapshot.py import <file> --dry-run
+BACKUP_CHUNK_BYTES = 900_000  # Firestore documents top out at 1 MiB
+Backup = namedtuple('Backup', 'backup_id created reason counts size')
+
+def backup_league(league_id, reason):
+    """Snapshot the league and store it. Returns (Backup, compressed bytes); raises if it couldn't be stored."""
+    snap = snapshots.export_league(lambda name: league_col(league_id, name), league_id)
+    data = snapshots.dumps(snap)
+    created = datetime.now()
+    backup = Backup(f"{created:%Y%m%d-%H%M%S}_{reason}", created, reason, snap['counts'], len(data))
+    backup_ref = league_col(league_id, 'backups').document(backup.backup_id)
+    chunks = [data[i:i + BACKUP_CHUNK_BYTES] for i in range(0, len(data), BACKUP_CHUNK_BYTES)] or [b""]
+    for i, chunk in enumerate(chunks):
+        backup_ref.collection('chunks').document(f"{i:04d}").set({'data': chunk})
+    # Metadata last, so a backup that failed part-way is never listed
+    backup_ref.set({'created': created, 'reason': reason, 'counts': snap['counts'], 'size': len(data), 'chunks': len(chunks)})
+    _bump_version(('backups', league_id))
+    return backup, data
+
+@st.cache_resource(ttl=3600, max_entries=50)
+def get_recent_backups(league_id, version, limit=5):
+    """Metadata only - the bytes are fetched when an admin asks for one"""
+    docs = league_col(league_id, 'backups').order_by('created', direction='DESCENDING').limit(limit).stream()
+    return tuple(Backup(doc.id, d['created'], d['reason'], d.get('counts', {}), d.get('size', 0))
+                 for doc, d in ((doc, doc.to_dict()) for doc in docs))
+
+def recent_backups(league_id):
+    return get_recent_backups(league_id, _league_versions()['versions'].get(('backups', league_id), 0))
+
+def load_backup_data(league_id, backup_id):
+    chunks = league_col(league_id, 'backups').document(backup_id).collection('chunks').order_by('__name__').stream()
+    return b"".join(doc.to_dict()['data'] for doc in chunks)
+
+def backup_filename(league_id, created):
+    return f"lms-{league_id}-{created:%Y%m%d-%H%M}.json.gz"
+
+def admin_reset_game(league_id, current_gw, is_rollover=False):
+    """Returns (message, (Backup, bytes)). Nothing below can be undone, so if the backup can't be
+    stored this raises before anything is touched."""
+    backup = backup_league(league_id, 'rollover' if is_rollover else 'reset')
+    players_col = league_col(league_id, 'players')
+    picks_col = league_col(league_id, 'picks')
+    docs = players_col.stream()
     for doc in docs:
-        db.collection('players').document(doc.id).update({
+        players_col.document(doc.id).update({
             'status': 'pending', 
             'used_teams': [], 
             'eliminated_gw': None,
             'paid': False 
         })
-    picks = db.collection('picks').where('matchday', '==', current_gw).stream()
+        invalidate_player(league_id, doc.id)
+    picks = picks_col.where('matchday', '==', current_gw).stream()
     for pick in picks:
-        db.collection('picks').document(pick.id).delete()
+        picks_col.document(pick.id).delete()
+    sheets_col = league_col(league_id, 'pick_sheets')
+    for sheet in sheets_col.where('matchday', '==', current_gw).stream():
+        sheets_col.document(sheet.id).delete()
 
-    current_settings = get_game_settings()
+    current_settings = get_game_settings(league_id, data_version(league_id))
     current_mult = current_settings.get('rollover_multiplier', 1)
     new_mult = current_mult + 1 if is_rollover else 1
-    update_game_settings(new_mult)
-    return "ROLLOVER!" if is_rollover else "RESET!"
+    update_game_settings(league_id, new_mult)
+    return ("ROLLOVER!" if is_rollover else "RESET!"), backup
 
-def display_player_status(picks, matches, players_data, reveal_mode=False):
-    # UPDATED: Wrapped in Expander + Standard List Layout
-    team_results = calculate_team_results(matches)
-    user_pick_map = {p['user']: p['team'] for p in picks}
-    crest_map = {}
-    for m in matches:
-        crest_map[m['homeTeam']['name']] = m['homeTeam']['crest']
-        crest_map[m['awayTeam']['name']] = m['awayTeam']['crest']
+# Rendered card HTML for one league/gameweek/reveal mode, keyed on the league's content and the
+# fixture results - so it stays valid until a pick, status or result actually changes, even across
+# TTL reloads. The scheduler warms the post-deadline and reveal versions ahead of time.
+PlayerCards = namedtuple('PlayerCards', 'active_count waiting_count active_html eliminated_count eliminated_html')
+
+def results_key(matchday):
+    return tuple(sorted(matchday.team_results.items()))
+
+@st.cache_resource(max_entries=200)
+def build_player_cards(_state, _matchday, league_id, gw, fingerprint, results, reveal_mode):
+    state, team_results, crest_map = _state, _matchday.team_results, _matchday.crest_map
         
+    # Players are shared snapshot records - pending elimination is tracked alongside, never written onto them
     active_players = []
     eliminated_players = []
     waiting_count = 0 
     
-    for p in players_data:
-        name = p['name']
-        status = p.get('status')
-        team = user_pick_map.get(name)
+    for p in state.players:
+        pick = state.pick_by_user.get(p.name)
+        team = pick.team if pick else None
         result = team_results.get(team, 'PENDING') if team else 'PENDING'
         
-        if status == 'eliminated':
-            eliminated_players.append(p)
-        elif status == 'active' and result == 'LOSE':
-            p['pending_elimination'] = True 
-            eliminated_players.append(p)
-        elif status in ['active', 'pending']: 
+        if p.status == 'eliminated':
+            eliminated_players.append((p, False))
+        elif p.status == 'active' and result == 'LOSE':
+            eliminated_players.append((p, True))
+        elif p.status in ['active', 'pending']: 
             if team:
                 active_players.append(p)
             else:
                 waiting_count += 1
             
-    active_players.sort(key=lambda x: x['name'])
-    eliminated_players.sort(key=lambda x: (x.get('pending_elimination', False), x.get('eliminated_gw', 0)), reverse=True)
+    eliminated_players.sort(key=lambda x: (x[1], x[0].eliminated_gw or 0), reverse=True)
+
+    active_html = ""
+    for p in active_players:
+        name = p.name
+        team = state.pick_by_user[name].team
+        paid_icon = "" if p.paid else " <span style='font-size:10px; color:#ff4b4b; margin-left:5px'>(UNPAID)</span>"
+
+        if team:
+            if reveal_mode:
+                badge_url = crest_map.get(team, "")
+                result = team_results.get(team, 'PENDING')
+                status_html = ""
+                if result == 'WIN': status_html = '<div class="status-tag-win">THROUGH</div>'
+                mid = f'<img src="{badge_url}" class="pc-badge">{status_html}' if badge_url else '<span class="pc-hidden">⚽</span>'
+                btm = f'<div class="pc-team">{team}</div>'
+            else:
+                mid = '<span class="pc-hidden">🔒</span>'
+                btm = '<div class="pc-team">HIDDEN</div>'
+        else:
+            mid = '<span class="pc-hidden">⏳</span>'
+            btm = '<div class="pc-team" style="color:#aaa">NO PICK</div>'
+
+        active_html += f'<div class="player-card"><div class="pc-name">{name}{paid_icon}</div><div class="pc-center">{mid}</div>{btm}</div>'
+
+    elim_html = ""
+    for p, pending_elimination in eliminated_players:
+        name = p.name
+        if pending_elimination:
+            team = state.pick_by_user[name].team
+            badge_url = crest_map.get(team, "")
+            mid = f'<img src="{badge_url}" class="pc-badge"><div class="status-tag-loss">OUT</div>' if badge_url else '❌'
+            btm = f'<div class="pc-eliminated-text" style="color:#ff4b4b">PENDING ADMIN</div>'
+            card_class = "player-card"
+        else:
+            gw_out = p.eliminated_gw or '?'
+            mid = '<span class="pc-hidden" style="opacity:0.5">💀</span>'
+            btm = f'<div class="pc-eliminated-text">OUT GW{gw_out}</div>'
+            card_class = "player-card-eliminated"
+        elim_html += f'<div class="{card_class}"><div class="pc-name" style="color:#aaa">{name}</div><div class="pc-center">{mid}</div>{btm}</div>'
+
+    return PlayerCards(len(active_players), waiting_count, active_html, len(eliminated_players), elim_html)
+
+def get_player_cards(state, matchday, reveal_mode):
+    return build_player_cards(state, matchday, state.league_id, state.gw, state.fingerprint, results_key(matchday), reveal_mode)
+
+def display_player_status(state, matchday, reveal_mode=False):
+    # UPDATED: Wrapped in Expander + Standard List Layout
+    cards = get_player_cards(state, matchday, reveal_mode)
 
     # --- STILL STANDING SECTION (EXPANDABLE) ---
-    standing_title = f"🛡️ STILL STANDING ({len(active_players)})"
+    standing_title = f"🛡️ STILL STANDING ({cards.active_count})"
     if not reveal_mode:
         standing_title += " - 🔒 PICKS HIDDEN"
         
     with st.expander(standing_title, expanded=True):
-        active_html = ""
-        for p in active_players:
-            name = p['name']
-            team = user_pick_map.get(name, None)
-            is_paid = p.get('paid', False)
-            paid_icon = "" if is_paid else " <span style='font-size:10px; color:#ff4b4b; margin-left:5px'>(UNPAID)</span>"
-
-            if team:
-                if reveal_mode:
-                    badge_url = crest_map.get(team, "")
-                    result = team_results.get(team, 'PENDING')
-                    status_html = ""
-                    if result == 'WIN': status_html = '<div class="status-tag-win">THROUGH</div>'
-                    mid = f'<img src="{badge_url}" class="pc-badge">{status_html}' if badge_url else '<span class="pc-hidden">⚽</span>'
-                    btm = f'<div class="pc-team">{team}</div>'
-                else:
-                    mid = '<span class="pc-hidden">🔒</span>'
-                    btm = '<div class="pc-team">HIDDEN</div>'
-            else:
-                mid = '<span class="pc-hidden">⏳</span>'
-                btm = '<div class="pc-team" style="color:#aaa">NO PICK</div>'
-
-            active_html += f'<div class="player-card"><div class="pc-name">{name}{paid_icon}</div><div class="pc-center">{mid}</div>{btm}</div>'
-        
-        if active_html:
-            st.markdown(f'<div class="player-row-container">{active_html}</div>', unsafe_allow_html=True)
+        if cards.active_html:
+            st.markdown(f'<div class="player-row-container">{cards.active_html}</div>', unsafe_allow_html=True)
         
-        if waiting_count > 0:
-            st.caption(f"⏳ Waiting for picks from {waiting_count} other players...")
+        if cards.waiting_count > 0:
+            st.caption(f"⏳ Waiting for picks from {cards.waiting_count} other players...")
 
     # --- THE FALLEN SECTION (EXPANDABLE) ---
-    if eliminated_players:
-        with st.expander(f"🪦 THE FALLEN ({len(eliminated_players)})", expanded=False):
-            elim_html = ""
-            for p in eliminated_players:
-                name = p['name']
-                if p.get('pending_elimination'):
-                    team = user_pick_map.get(name)
-                    badge_url = crest_map.get(team, "")
-                    mid = f'<img src="{badge_url}" class="pc-badge"><div class="status-tag-loss">OUT</div>' if badge_url else '❌'
-                    btm = f'<div class="pc-eliminated-text" style="color:#ff4b4b">PENDING ADMIN</div>'
-                    card_class = "player-card"
-                else:
-                    gw_out = p.get('eliminated_gw', '?')
-                    mid = '<span class="pc-hidden" style="opacity:0.5">💀</span>'
-                    btm = f'<div class="pc-eliminated-text">OUT GW{gw_out}</div>'
-                    card_class = "player-card-eliminated"
-                elim_html += f'<div class="{card_class}"><div class="pc-name" style="color:#aaa">{name}</div><div class="pc-center">{mid}</div>{btm}</div>'
-            st.markdown(f'<div class="player-row-container">{elim_html}</div>', unsafe_allow_html=True)
+    if cards.eliminated_count:
+        with st.expander(f"🪦 THE FALLEN ({cards.eliminated_count})", expanded=False):
+            st.markdown(f'<div class="player-row-container">{cards.eliminated_html}</div>', unsafe_allow_html=True)
+
+def display_player_history(state, name):
+    player = state.by_name.get(name)
+    try:
+        history = get_player_history(state.league_id, name, player_version(state.league_id, name))
+    except DataUnavailable as e:
+        note_firestore_error(e.__cause__)
+        if type(e.__cause__).__name__ == 'FailedPrecondition':
+            st.error("⚠️ Pick history needs the (user, matchday) index on picks - deploy firestore.indexes.json "
+                     "with `firebase deploy --only firestore:indexes`.")
+        else:
+            st.error(f"⚠️ Couldn't load {name}'s pick history ({e}). If this persists, check the indexes in firestore.indexes.json are deployed.")
+        return
+    
+    if player:
+        status = player.status.upper() if player.status else "?"
+        if player.status == 'eliminated': status += f" (GW{player.eliminated_gw or '?'})"
+        st.caption(f"Status: {status} · {'Paid' if player.paid else 'Unpaid'}")
+    if not history:
+        st.info(f"No picks found for {name}.")
+        return
+    
+    result_icons = {'WIN': "✅ WIN", 'LOSE': "❌ LOSE", 'PENDING': "⏳ PENDING"}
+    rows = ["| GW | Team | Result | Picked |", "|---|---|---|---|"]
+    for pk in history:
+        picked = pk.timestamp.strftime("%d %b %H:%M") if pk.timestamp else "-"
+        rows.append(f"| {pk.matchday} | {pk.team} | {result_icons.get(pk.result, '-')} | {picked} |")
+    st.markdown("\n".join(rows))
+
+def finish_first_render(render_start):
+    """Close off the first-render breakdown and print it once to the server log"""
+    prof = startup_profile()
+    if prof['first_render_done']: return
+    prof['first_render']['total'] = (time.perf_counter() - render_start) * 1000
+    prof['first_render_done'] = True
+    steps = {**prof['imports'], **prof['setup'], **prof['first_render']}
+    print("[startup] " + ", ".join(f"{k}={v:.0f}ms" for k, v in steps.items()))
+
+def display_quota_status():
+    quota = quota_status()
+    st.caption(f"Mode: {quota['name']}" + (" (Firestore reported quota exhausted)" if quota['exhausted'] else ""))
+    for key, used in quota['usage'].items():
+        budget = quota['budgets'].get(key)
+        if budget:
+            st.progress(min(used / budget, 1.0), text=f"{key.replace('_', ' ')}: {used:,} / {budget:,}")
+
+def display_quota_banner(quota):
+    if quota['exhausted']:
+        st.error("⚠️ Our database quota has run out for today - the league below may be out of date. Picks may fail until it resets.")
+    elif quota['level'] >= 2:
+        st.warning("⚠️ High traffic - the league view refreshes less often right now. Picks still go through as normal.")
+
+def display_startup_profile():
+    prof = startup_profile()
+    st.caption(f"Process started {prof['started'].strftime('%Y-%m-%d %H:%M:%S')}")
+    for title, kind in (("Lazy imports", 'imports'), ("One-off setup", 'setup'), ("First render", 'first_render')):
+        if prof[kind]:
+            lines = "\n".join(f"- {k}: {v:.0f} ms" for k, v in prof[kind].items())
+            st.markdown(f"**{title}**\n{lines}")
 
 def display_fixtures_visual(matches):
     st.subheader(f"Fixtures")
@@ -493,12 +1108,217 @@ def display_fixtures_visual(matches):
 
         st.markdown(f'<div class="match-card"><div class="match-info-row"><div class="team-container home-team"><span>{home["name"]}</span><img src="{home["crest"]}" class="crest-img"></div><div class="score-box">{center_html}</div><div class="team-container away-team"><img src="{away["crest"]}" class="crest-img"><span>{away["name"]}</span></div></div></div>', unsafe_allow_html=True)
 
+# --- FIXTURE TIMELINE SCHEDULER ---
+# A background thread turns the fixture list into a timeline of one-off jobs per gameweek:
+#   lock     first kickoff - 1h      warm the post-deadline (picks hidden) view
+#   reveal   first kickoff - 30min   warm the reveal-mode view
+#   sweep    first kickoff           eliminate non-pickers (leagues with auto_sweep only)
+#   settle   each kickoff + 135min   refetch the result, write it back, eliminate losers
+#   rollover last kickoff + 135min   move every league on the competition to the next gameweek
+# Finished job ids are persisted to a local JSON file so a restart doesn't run anything twice.
+# Page views still settle lazily as a fallback for when the process was scaled to zero.
+SCHEDULER_TICK_SECONDS = 30
+SCHEDULER_TIMELINE_REFRESH = timedelta(minutes=10)
+SCHEDULER_RETRY_DELAY = timedelta(minutes=15)
+MATCH_SETTLE_BUFFER = timedelta(minutes=135)
+# A sweep replayed long after kickoff (e.g. after days scaled to zero) could hit players who joined since
+SWEEP_MAX_LATENESS = timedelta(hours=12)
+
+Job = namedtuple('Job', 'job_id due kind competition_id gw league_id match_key')
+
+def parse_kickoff(match):
+    return datetime.fromisoformat(match['utcDate'].replace('Z', ''))
+
+def match_key(match):
+    return str(match.get('id') or f"{match['homeTeam']['name']}-{match['awayTeam']['name']}")
+
+def build_timeline():
+    jobs = []
+    for competition_id in sorted({lg['competition_id'] for lg in LEAGUES.values()}):
+        scheduled = get_scheduled_matches(competition_id, fixtures_version(competition_id))
+        if not scheduled: continue
+        api_gw = scheduled[0]['matchday']
+
+        for gw in (api_gw - 1, api_gw):
+            if gw < 1: continue
+            matches = [m for m in get_matchday(competition_id, gw, fixtures_version(competition_id)).matches
+                       if m['status'] not in ['POSTPONED', 'CANCELLED']]
+            if not matches: continue
+            kickoffs = [parse_kickoff(m) for m in matches]
+            first_kickoff, last_kickoff = min(kickoffs), max(kickoffs)
+            prefix = f"{competition_id}:GW{gw}"
+
+            jobs.append(Job(f"{prefix}:lock", first_kickoff - timedelta(hours=1), 'lock', competition_id, gw, None, None))
+            jobs.append(Job(f"{prefix}:reveal", first_kickoff - timedelta(minutes=30), 'reveal', competition_id, gw, None, None))
+            for m, kickoff in zip(matches, kickoffs):
+                jobs.append(Job(f"{prefix}:settle:{match_key(m)}", kickoff + MATCH_SETTLE_BUFFER, 'settle', competition_id, gw, None, match_key(m)))
+            jobs.append(Job(f"{prefix}:rollover", last_kickoff + MATCH_SETTLE_BUFFER, 'rollover', competition_id, gw, None, None))
+            for lg in LEAGUES.values():
+                if lg['competition_id'] == competition_id and lg['auto_sweep']:
+                    jobs.append(Job(f"{lg['id']}:GW{gw}:sweep", first_kickoff, 'sweep', competition_id, gw, lg['id'], None))
+
+    return sorted(jobs, key=lambda j: j.due)
+
+def leagues_on(competition_id):
+    return [lg_id for lg_id, lg in LEAGUES.items() if lg['competition_id'] == competition_id]
+
+def warm_views(competition_id, gw, reveal_mode):
+    """Precompute rendered cards for the transition. They are keyed on league content and results, so they
+    serve every viewer until something changes; the state itself is only refetched once it outlives its TTL."""
+    matchday = get_matchday(competition_id, gw, fixtures_version(competition_id))
+    for league_id in leagues_on(competition_id):
+        state = league_state(league_id, gw)
+        get_player_cards(state, matchday, reveal_mode)
+
+def run_job(job, refreshed):
+    """Run one job. Returns False if it is not ready yet and should be retried later.
+    refreshed: competitions whose fixtures were already refetched this tick."""
+    if job.kind in ['lock', 'reveal']:
+        warm_views(job.competition_id, job.gw, reveal_mode=job.kind == 'reveal')
+        return True
+
+    if job.kind == 'sweep':
+        if datetime.utcnow() - job.due > SWEEP_MAX_LATENESS:
+            print(f"Skipping stale sweep {job.job_id}")
+            return True
+        swept = sweep_non_pickers(league_state(job.league_id, job.gw))
+        for name in swept:
+            log_attempt(job.league_id, name, "AUTO_SWEEP", f"Eliminated for no pick in GW{job.gw}")
+        return True
+
+    # settle / rollover need fresh results from football-data - at most one refetch per tick
+    if job.competition_id not in refreshed:
+        invalidate_fixtures(job.competition_id)
+        refreshed.add(job.competition_id)
+    matchday = get_matchday(job.competition_id, job.gw, fixtures_version(job.competition_id))
+    if not matchday.matches: return False
+    if job.kind == 'settle':
+        match = next((m for m in matchday.matches if match_key(m) == job.match_key), None)
+        if match is None or match['status'] in ['POSTPONED', 'CANCELLED']: return True
+        if match['status'] != 'FINISHED': return False
+        for league_id in leagues_on(job.competition_id):
+            settle_gameweek(league_state(league_id, job.gw), matchday)
+        return True
+
+    if job.kind == 'rollover':
+        if any(m['status'] not in ['FINISHED', 'POSTPONED', 'CANCELLED'] for m in matchday.matches): return False
+        for league_id in leagues_on(job.competition_id):
+            invalidate_league(league_id)
+        warm_views(job.competition_id, job.gw + 1, reveal_mode=False)
+        return True
+
+    return True
+
+def _load_scheduler_progress(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get('done', {})
+    except (OSError, ValueError):
+        return {}
+
+def _save_scheduler_progress(path, done):
+    # Only keep a season's worth of job ids
+    cutoff = (datetime.utcnow() - timedelta(days=60)).isoformat()
+    done = {k: v for k, v in done.items() if v >= cutoff}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({'done': done}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+    return done
+
+def scheduler_tick(scheduler):
+    now = datetime.utcnow()
+    if scheduler['timeline_built'] is None or now - scheduler['timeline_built'] > SCHEDULER_TIMELINE_REFRESH:
+        scheduler['timeline'] = build_timeline()
+        scheduler['timeline_built'] = now
+
+    refreshed = set()
+    for job in scheduler['timeline']:
+        if job.due > now: break
+        if job.job_id in scheduler['done'] or scheduler['retry_at'].get(job.job_id, now) > now: continue
+        try:
+            finished = run_job(job, refreshed)
+        except Exception as e:
+            print(f"Scheduler job {job.job_id} failed: {e}")
+            scheduler['last_error'] = f"{job.job_id}: {e}"
+            finished = False
+        if not finished:
+            scheduler['retry_at'][job.job_id] = now + SCHEDULER_RETRY_DELAY
+            continue
+        with scheduler['lock']:
+            scheduler['done'][job.job_id] = datetime.utcnow().isoformat()
+            scheduler['done'] = _save_scheduler_progress(scheduler['path'], scheduler['done'])
+        scheduler['retry_at'].pop(job.job_id, None)
+        # Settling changes the fixture list - rebuild on the next tick
+        if job.kind in ['settle', 'rollover']: scheduler['timeline_built'] = None
+
+def _scheduler_loop(scheduler):
+    while True:
+        try:
+            scheduler_tick(scheduler)
+        except Exception as e:
+            print(f"Scheduler tick failed: {e}")
+            scheduler['last_error'] = str(e)
+        time.sleep(SCHEDULER_TICK_SECONDS)
+
+@st.cache_resource
+def start_scheduler():
+    """Start the background scheduler once per process"""
+    path = CONFIG['scheduler_state_path']
+    scheduler = {
+        'lock': threading.Lock(),
+        'path': path,
+        'done': _load_scheduler_progress(path),
+        'retry_at': {},
+        'timeline': [],
+        'timeline_built': None,
+        'last_error': None,
+    }
+    if CONFIG['scheduler_enabled']:
+        threading.Thread(target=_scheduler_loop, args=(scheduler,), name="lms-scheduler", daemon=True).start()
+    return scheduler
+
+def display_scheduler_status():
+    scheduler = start_scheduler()
+    if not CONFIG['scheduler_enabled']:
+        st.caption("Scheduler disabled (SCHEDULER_ENABLED = false)")
+        return
+    now = datetime.utcnow()
+    upcoming = [j for j in scheduler['timeline'] if j.job_id not in scheduler['done']][:8]
+    st.caption(f"{len(scheduler['done'])} jobs done")
+    if upcoming:
+        lines = "\n".join(
+            f"- {'⏰' if j.due <= now else '🕒'} {format_deadline_date(j.due)} · {j.kind} GW{j.gw}" + (f" ({j.match_key})" if j.match_key else "")
+            for j in upcoming
+        )
+        st.markdown(lines)
+    if scheduler['last_error']:
+        st.caption(f"Last error: {scheduler['last_error']}")
+
 # --- 5. MAIN APP LOGIC ---
 def main():
-    inject_custom_css()
+    render_start = time.perf_counter()
+    start_scheduler()
+    with profiled('css'):
+        inject_custom_css()
+
+    # --- LEAGUE SELECTION (?league=<id>) ---
+    league_id = st.query_params.get("league", DEFAULT_LEAGUE_ID)
+    if league_id not in LEAGUES:
+        st.error(f"Unknown league '{league_id}'")
+        st.stop()
+    league = LEAGUES[league_id]
+    competition_id = league['competition_id']
+    entry_fee = league['entry_fee']
+
+    # Logins are per league - don't carry an admin session across into another league
+    if st.session_state.get('login_league') != league_id:
+        st.session_state.admin_logged_in = False
+        st.session_state.treasurer_logged_in = False
+        st.session_state.login_league = league_id
 
     # --- ADMIN & TREASURER SIDEBAR ---
-    with st.sidebar:
+    with st.sidebar, profiled('sidebar'):
         st.header("🔧 Admin Panel")
         
         if 'admin_logged_in' not in st.session_state: st.session_state.admin_logged_in = False
@@ -508,10 +1328,10 @@ def main():
             pwd = st.text_input("Password", type="password")
             
             if st.button("Login"):
-                if pwd == ADMIN_PASSWORD:
+                if pwd == league['admin_password']:
                     st.session_state.admin_logged_in = True
                     st.rerun()
-                elif pwd == TREASURER_PASSWORD:
+                elif pwd == league['treasurer_password']:
                     st.session_state.treasurer_logged_in = True
                     st.rerun()
                 else:
@@ -527,26 +1347,30 @@ def main():
             st.divider()
             st.subheader("💰 Payment Tracker")
             
-            all_players_full_raw = get_all_players_full()
-            players_payment_list = sorted(all_players_full_raw, key=lambda x: x['name'])
+            try:
+                players_payment_list = league_players(league_id)
+            except DataUnavailable as e:
+                # No ticking against a stale list - it would write old payment states back
+                st.error(f"⚠️ Couldn't load players ({e}).")
+                players_payment_list = ()
             
             paid_count = 0
             
             with st.expander("Tick who has paid:", expanded=True):
                 for p in players_payment_list:
-                    name = p['name']
-                    is_paid = p.get('paid', False)
+                    name = p.name
+                    is_paid = p.paid
                     
                     new_status = st.checkbox(f"{name}", value=is_paid, key=f"pay_{name}")
                     
                     if new_status != is_paid:
-                        db.collection('players').document(name).update({'paid': new_status})
+                        league_col(league_id, 'players').document(name).update({'paid': new_status})
                         st.toast(f"Payment updated: {name}")
-                        st.cache_data.clear()
+                        invalidate_league(league_id)
                         
                     if new_status: paid_count += 1
             
-            st.metric("Total Collected", f"£{paid_count * ENTRY_FEE}")
+            st.metric("Total Collected", f"£{paid_count * entry_fee}")
 
         # ADMIN VIEW
         if st.session_state.admin_logged_in:
@@ -554,9 +1378,17 @@ def main():
             st.subheader("📜 Audit Logs")
             
             # --- LOG VIEWER IN SIDEBAR ---
-            if st.checkbox("Show Activity Log"): 
+            quota = quota_status()
+            if quota['level'] >= 3:
+                st.caption("🚫 Activity log is off while the Firestore quota is critical.")
+            elif st.checkbox("Show Activity Log"): 
                 try:
-                    docs = db.collection('logs').stream()
+                    logs_query = league_col(league_id, 'logs')
+                    if quota['level'] >= 1:
+                        # Conserving reads - only the most recent entries
+                        logs_query = logs_query.order_by('timestamp', direction='DESCENDING').limit(200)
+                        st.caption("Showing the latest 200 entries while conserving quota.")
+                    docs = logs_query.stream()
                     log_list = []
                     for doc in docs:
                         d = doc.to_dict()
@@ -567,6 +1399,7 @@ def main():
                     
                     if log_list:
                         # Show table with newest on top
+                        pd = lazy_import('pandas')
                         df_logs = pd.DataFrame(log_list)
                         # Reorder columns to put Timestamp and User first
                         cols = ['timestamp', 'user', 'action', 'details']
@@ -580,37 +1413,78 @@ def main():
                 except Exception as e:
                     st.error(f"Error fetching logs: {e}")
 
+            with st.expander("📊 Firestore Quota"):
+                display_quota_status()
+            with st.expander("⏱️ Startup Profile"):
+                display_startup_profile()
+            with st.expander("🗓️ Scheduler"):
+                display_scheduler_status()
+
             st.divider()
             st.subheader("⚡ Super Admin Tools")
             
-            real_gw = get_current_gameweek_from_api() 
-            gw_override = st.slider("📆 Override Gameweek", min_value=1, max_value=38, value=real_gw)
+            real_gw = get_current_gameweek_from_api(league_id, data_version(league_id))
+            gw_override = st.slider("📆 Override Gameweek", min_value=1, max_value=LEAGUES[league_id]['matchdays'], value=real_gw)
             
             st.divider()
             
             if st.button("⚠️ Initialize 'Paid' Status"):
-                all_docs = db.collection('players').stream()
+                players_col = league_col(league_id, 'players')
+                all_docs = players_col.stream()
                 count = 0
                 for doc in all_docs:
                     if 'paid' not in doc.to_dict():
-                        db.collection('players').document(doc.id).update({'paid': False})
+                        players_col.document(doc.id).update({'paid': False})
                         count += 1
                 st.success(f"Updated {count} players with Payment status.")
-                st.cache_data.clear()
+                invalidate_league(league_id)
             
-            if st.button("🔄 ROLLOVER (Everyone Lost)"):
-                msg = admin_reset_game(gw_override, is_rollover=True)
-                st.warning(msg)
-                st.cache_data.clear()
-                st.rerun()
-            if st.button("⚠️ HARD RESET (New Season)"):
-                msg = admin_reset_game(gw_override, is_rollover=False)
-                st.success(msg)
-                st.cache_data.clear()
-                st.rerun()
+            for label, is_rollover in [("🔄 ROLLOVER (Everyone Lost)", True), ("⚠️ HARD RESET (New Season)", False)]:
+                if st.button(label):
+                    try:
+                        msg, st.session_state.backup_file = admin_reset_game(league_id, gw_override, is_rollover=is_rollover)
+                    except Exception as e:
+                        note_firestore_error(e)
+                        st.error(f"⚠️ Couldn't back up the league ({e}) - nothing was reset.")
+                    else:
+                        log_attempt(league_id, "ADMIN", "RESET", f"{msg} GW{gw_override}, backup {st.session_state.backup_file[0].backup_id}")
+                        invalidate_league(league_id)
+                        st.rerun()
             if st.button("⚡ Inject Spreadsheet Data"):
-                st.cache_data.clear()
+                invalidate_league(league_id)
                 st.rerun()
+            
+            with st.expander("💾 Backups"):
+                st.caption("A backup is taken automatically before every rollover or reset.")
+                if st.button("Back Up Now"):
+                    try:
+                        st.session_state.backup_file = backup_league(league_id, 'manual')
+                    except Exception as e:
+                        note_firestore_error(e)
+                        st.error(f"⚠️ Backup failed ({e}).")
+                if st.session_state.get('backup_file'):
+                    backup, data = st.session_state.backup_file
+                    st.download_button(f"⬇️ Download {backup.reason} backup of {backup.created.strftime('%d %b %H:%M')} ({len(data) // 1024} KB)",
+                                       data=data, file_name=backup_filename(league_id, backup.created), mime="application/gzip")
+                try:
+                    backups = recent_backups(league_id)
+                except Exception as e:
+                    note_firestore_error(e)
+                    st.caption(f"Couldn't list stored backups ({e}).")
+                    backups = ()
+                if backups:
+                    labels = {f"{b.created.strftime('%d %b %H:%M')} · {b.reason} · {b.counts.get('players', 0)} players": b for b in backups}
+                    chosen = labels[st.selectbox("Stored backups", list(labels), key="backup_choice")]
+                    if st.button("Fetch Backup"):
+                        st.session_state.backup_file = (chosen, load_backup_data(league_id, chosen.backup_id))
+                        st.rerun()
+            
+            with st.expander("🗂️ Pick Storage"):
+                layout = picks_layout(league_id)
+                st.caption(f"Layout: **{layout}** · {LEAGUES[league_id]['pick_shards']} shards per gameweek")
+                st.caption("To move to pick sheets: set picks_layout to 'dual', build them here, then switch to 'consolidated'.")
+                if st.button("Build Pick Sheets from Per-User Picks", disabled=layout != 'dual'):
+                    st.success(f"Copied {migrate_picks_to_sheets(league_id)} picks into pick sheets.")
                 
             st.divider()
             st.subheader("⚡ Emergency Force Pick")
@@ -621,51 +1495,64 @@ def main():
                 
                 if st.button("Force Submit"):
                     if force_name and force_team:
-                        player_ref = db.collection('players').document(force_name)
+                        firestore = lazy_import('google.cloud.firestore')
+                        player_ref = league_col(league_id, 'players').document(force_name)
                         player_ref.set({
                             'name': force_name,
                             'status': 'active',
                             'used_teams': firestore.ArrayUnion([force_team])
                         }, merge=True)
-                        pick_id = f"{force_name}_GW{force_gw}"
-                        db.collection('picks').document(pick_id).set({
-                            'user': force_name,
+                        write_pick(league_id, force_name, force_gw, {
                             'team': force_team,
-                            'matchday': force_gw,
                             'timestamp': datetime.now(),
                             'result': 'PENDING'
                         })
-                        log_attempt(force_name, "FORCE_PICK", f"Admin forced {force_team} for GW{force_gw}")
+                        log_attempt(league_id, force_name, "FORCE_PICK", f"Admin forced {force_team} for GW{force_gw}")
                         st.success(f"Forced {force_name} with {force_team}!")
-                        st.cache_data.clear()
+                        invalidate_league(league_id)
+                        invalidate_player(league_id, force_name)
                     else:
                         st.error("Enter Name and Team")
                         
+            st.divider()
+            st.subheader("📖 Player History")
+            try:
+                admin_state = league_state(league_id, gw_override)
+            except DataUnavailable as e:
+                admin_state = last_good_state(league_id, gw_override)
+                if admin_state: st.warning(f"⚠️ Live data unavailable - player list as of {admin_state.loaded_at.strftime('%H:%M')}.")
+                else: st.error(f"⚠️ Couldn't load players ({e}).")
+            if admin_state:
+                history_name = st.selectbox("Player", ["Select a player..."] + list(admin_state.by_name), key="history_player")
+                if history_name != "Select a player...":
+                    display_player_history(admin_state, history_name)
+            if st.button("🩹 Backfill Results for Past Gameweeks"):
+                with st.spinner("Fetching past results..."):
+                    try:
+                        written, missing = backfill_results(league_id, real_gw)
+                    except DataUnavailable as e:
+                        st.error(f"⚠️ Couldn't load picks ({e}).")
+                    else:
+                        st.success(f"Wrote results onto {written} picks.")
+                        if missing: st.warning(f"No fixtures came back for GW {', '.join(map(str, missing))} - run it again later to fill them.")
+
             st.divider()
             st.subheader("🧹 Late Sweeper")
             if st.button("🚫 Eliminate Non-Pickers"):
-                all_p = get_all_players_full()
-                gw_p = get_all_picks_for_gw(gw_override)
-                picked_names = {p.get('user') for p in gw_p if p.get('user')}
-                
-                elim_count = 0
-                for pl in all_p:
-                    nm = pl['name']
-                    stt = pl.get('status')
-                    if stt in ['active', 'pending'] and nm not in picked_names:
-                        db.collection('players').document(nm).update({
-                            'status': 'eliminated',
-                            'eliminated_gw': gw_override
-                        })
-                        st.toast(f"Eliminated: {nm}")
-                        elim_count += 1
-                
-                if elim_count > 0:
-                    st.success(f"Sweep complete! {elim_count} players eliminated.")
-                    st.cache_data.clear()
-                    st.rerun()
+                # Never sweep from a snapshot - someone who has picked since would be eliminated
+                try:
+                    swept = sweep_non_pickers(league_state(league_id, gw_override))
+                except DataUnavailable as e:
+                    st.error(f"⚠️ Couldn't load live picks ({e}) - nobody was eliminated. Try again shortly.")
                 else:
-                    st.info("Everyone has picked!")
+                    for nm in swept:
+                        st.toast(f"Eliminated: {nm}")
+                    
+                    if swept:
+                        st.success(f"Sweep complete! {len(swept)} players eliminated.")
+                        st.rerun()
+                    else:
+                        st.info("Everyone has picked!")
 
             st.divider()
             st.subheader("Test Simulations")
@@ -684,11 +1571,12 @@ def main():
             if st.session_state.sim_winner: st.warning("Simulating WINNER")
             if st.session_state.sim_rollover: st.warning("Simulating ROLLOVER")
 
-    st.markdown("""
+    subtitle = "SEASON 25/26" if league_id == DEFAULT_LEAGUE_ID else f"{league['name'].upper()} - SEASON 25/26"
+    st.markdown(f"""
         <div class="hero-container">
             <img src="https://cdn.freebiesupply.com/images/large/2x/premier-league-logo-black-and-white.png" class="hero-logo">
             <div class="hero-title">LAST MAN STANDING</div>
-            <div class="hero-subtitle">SEASON 25/26</div>
+            <div class="hero-subtitle">{subtitle}</div>
         </div>
     """, unsafe_allow_html=True)
     
@@ -699,19 +1587,46 @@ def main():
         try: gw = gw_override
         except NameError: pass 
     else:
-        gw = get_current_gameweek_from_api()
+        with profiled('gameweek'):
+            gw = get_current_gameweek_from_api(league_id, data_version(league_id))
     
-    matches = get_matches_for_gameweek(gw)
+    with profiled('fixtures'):
+        matchday = get_matchday(competition_id, gw, fixtures_version(competition_id))
+    matches = matchday.matches
     if not matches:
         st.warning("No matches found.")
         st.stop()
     
-    auto_process_eliminations(gw, matches)
+    # --- QUOTA GOVERNOR / DEGRADED MODE ---
+    quota = quota_status()
+    display_quota_banner(quota)
+    spectator = not (st.session_state.admin_logged_in or st.session_state.treasurer_logged_in) and \
+        st.session_state.get('selected_radio_option', "Select your name...") == "Select your name..."
+    snapshot = last_good_state(league_id, gw)
+    from_snapshot = False
     
-    all_picks = get_all_picks_for_gw(gw)
-    all_players_full = get_all_players_full()
+    with profiled('league_state'):
+        if spectator and quota['snapshot_only'] and snapshot:
+            state, from_snapshot = snapshot, True
+            st.info(f"📸 Showing the league as of {snapshot.loaded_at.strftime('%H:%M')} to save database reads. Select your name for live data.")
+        else:
+            try:
+                state = league_state(league_id, gw)
+            except DataUnavailable as e:
+                if not snapshot:
+                    st.error(f"⚠️ Couldn't load the league from the database ({e}). Please try again in a few minutes.")
+                    st.stop()
+                state, from_snapshot = snapshot, True
+                st.warning(f"⚠️ Live data is unavailable right now - showing the league as of {snapshot.loaded_at.strftime('%H:%M')}.")
+    # Never settle from a fallback snapshot - only from a state league_state() just handed back
+    if not from_snapshot:
+        auto_process_eliminations(state, matchday)
     
-    settings = get_game_settings()
+    try:
+        settings = league_settings(league_id)
+    except DataUnavailable as e:
+        st.error(f"⚠️ Couldn't load the league settings ({e}). Please try again in a few minutes.")
+        st.stop()
     multiplier = settings.get('rollover_multiplier', 1)
     
     upcoming = [m for m in matches if m['status'] == 'SCHEDULED']
@@ -730,8 +1645,7 @@ def main():
     st.write("")
     c1, c2 = st.columns(2)
     
-    paid_players = len([p for p in all_players_full if p.get('paid', False) == True])
-    pot_total = paid_players * ENTRY_FEE * multiplier
+    pot_total = state.paid_count * entry_fee * multiplier
     
     pot_label = f"💰 ROLLOVER POT ({multiplier}x)" if multiplier > 1 else "💰 Prize Pot"
     
@@ -744,10 +1658,9 @@ def main():
     st.markdown("---")
     st.subheader("🎯 Make Your Selection")
 
-    user_picks_this_week = {p['user'] for p in all_picks if p.get('user')}
     active_available_names = sorted([
-        p['name'] for p in all_players_full 
-        if p.get('status') in ['active', 'pending'] and p['name'] not in user_picks_this_week
+        p.name for p in state.with_status('active', 'pending')
+        if p.name not in state.pick_by_user
     ])
     
     options = ["Select your name...", "➕ I am a New Player"] + active_available_names
@@ -770,8 +1683,7 @@ def main():
         new_name_input = st.text_input("Enter your full name (First & Last):")
         if new_name_input:
             clean_name = new_name_input.strip().title()
-            all_names = [p['name'] for p in all_players_full]
-            if clean_name in all_names: st.error(f"'{clean_name}' already exists!")
+            if clean_name in state.by_name: st.error(f"'{clean_name}' already exists!")
             else: actual_user_name = clean_name
     elif st.session_state.selected_radio_option != "Select your name...":
         actual_user_name = st.session_state.selected_radio_option
@@ -785,26 +1697,22 @@ def main():
         # Only log if user changes or first time
         if st.session_state.last_logged_visit != actual_user_name:
             status_tag = "LATE" if now > deadline else "ON TIME"
-            log_attempt(actual_user_name, "VISIT", f"Selected name. Status: {status_tag}")
+            log_attempt(league_id, actual_user_name, "VISIT", f"Selected name. Status: {status_tag}")
             st.session_state.last_logged_visit = actual_user_name
         # --- SILENT LOGGING END ---
 
-        user_ref = db.collection('players').document(actual_user_name)
-        user_doc = user_ref.get()
-        if user_doc.exists and user_doc.to_dict().get('status') == 'eliminated':
+        player = state.by_name.get(actual_user_name)
+        if player and player.status == 'eliminated':
             st.error(f"❌ Sorry {actual_user_name}, you have been eliminated!")
             st.info("Wait for a new game to start to rejoin.")
         else:
-            pick_id = f"{actual_user_name}_GW{gw}"
-            pick_ref = db.collection('picks').document(pick_id)
-            if pick_ref.get().exists:
+            if actual_user_name in state.pick_by_user:
                 st.success(f"✅ {actual_user_name} has already made a selection for Gameweek {gw}.")
                 st.caption("See the 'Still Standing' list below.")
             else:
                 # --- SUBMISSION LOGIC ---
-                used = user_doc.to_dict().get('used_teams', []) if user_doc.exists else []
-                valid = set([m['homeTeam']['name'] for m in matches] + [m['awayTeam']['name'] for m in matches])
-                available = sorted([t for t in valid if t not in used])
+                used = player.used_teams if player else ()
+                available = sorted(matchday.teams.difference(used))
                 
                 if now > deadline:
                     st.error("🚫 Gameweek Locked")
@@ -815,36 +1723,36 @@ def main():
                             team_choice = st.selectbox(f"Pick a team for {actual_user_name}:", available)
                             if st.form_submit_button("SUBMIT PICK"):
                                 # 1. Log Click Intent
-                                log_attempt(actual_user_name, "CLICKED_SUBMIT", f"User clicked submit for {team_choice}")
+                                log_attempt(league_id, actual_user_name, "CLICKED_SUBMIT", f"User clicked submit for {team_choice}")
                                 
                                 try:
-                                    pick_ref.set({'user': actual_user_name, 'team': team_choice, 'matchday': gw, 'timestamp': datetime.now()})
-                                    # FIXED: Removed 'paid': False to prevent overwriting payment status
-                                    user_ref.set({'name': actual_user_name, 'used_teams': firestore.ArrayUnion([team_choice]), 'status': 'active'}, merge=True)
-                                    
-                                    # 2. Log Success
-                                    log_attempt(actual_user_name, "SUCCESS", f"Write to DB complete")
-                                    
-                                    st.success(f"✅ Pick Locked In for {actual_user_name}!")
-                                    st.cache_data.clear() 
+                                    if submit_pick(league_id, actual_user_name, team_choice, gw):
+                                        # 2. Log Success
+                                        log_attempt(league_id, actual_user_name, "SUCCESS", f"Write to DB complete")
+                                        st.success(f"✅ Pick Locked In for {actual_user_name}!")
+                                    else:
+                                        # Picked from another tab or device since this page loaded - the first pick stands
+                                        log_attempt(league_id, actual_user_name, "ALREADY_PICKED", f"Rejected {team_choice}: pick already made")
+                                    invalidate_league(league_id)
+                                    invalidate_player(league_id, actual_user_name)
                                     st.rerun()
                                 except Exception as e:
                                     # 3. Log Error
-                                    log_attempt(actual_user_name, "ERROR", str(e))
+                                    log_attempt(league_id, actual_user_name, "ERROR", str(e))
                                     st.error("An error occurred. Please try again.")
                                     
                     if used: st.info(f"Teams used by {actual_user_name}: {', '.join(used)}")
 
     st.markdown("---")
     
-    survivors = [p for p in all_players_full if p.get('status') in ['active', 'pending']]
-    active_survivors = [p for p in all_players_full if p.get('status') == 'active']
-    pending_survivors = [p for p in all_players_full if p.get('status') == 'pending']
+    survivors = state.with_status('active', 'pending')
+    active_survivors = state.with_status('active')
+    pending_survivors = state.with_status('pending')
     
     sim_w = st.session_state.get('sim_winner', False)
     sim_r = st.session_state.get('sim_rollover', False)
     
-    if (len(survivors) == 0 and len(all_players_full) > 0) or sim_r:
+    if (len(survivors) == 0 and len(state.players) > 0) or sim_r:
         st.markdown("""<div class="banner-container banner-rollover"><div class="banner-title">💀 GAME OVER 💀</div><div class="banner-subtitle">ROLLOVER INCOMING</div></div>""", unsafe_allow_html=True)
     elif (len(active_survivors) == 1 and len(pending_survivors) == 0) or sim_w:
         survivor_name = "TEST WINNER"
@@ -852,16 +1760,19 @@ def main():
         if sim_w: show_winner = True
         else:
             survivor = active_survivors[0]
-            survivor_name = survivor['name']
-            pick_data = next((p for p in all_picks if p.get('user') == survivor_name), None)
+            survivor_name = survivor.name
+            pick_data = state.pick_by_user.get(survivor_name)
             if pick_data:
-                team_res = calculate_team_results(matches)
-                if team_res.get(pick_data['team']) == 'WIN': show_winner = True
+                if matchday.team_results.get(pick_data.team) == 'WIN': show_winner = True
         if show_winner:
             st.markdown(f"""<div class="banner-container banner-winner"><div class="banner-title">🏆 WE HAVE A WINNER! 🏆</div><div class="banner-subtitle">{survivor_name} has won £{pot_total} - Congratulations!</div><div style="font-size:12px; margin-top:5px;">A new game will begin soon.</div></div>""", unsafe_allow_html=True)
 
-    display_player_status(all_picks, matches, all_players_full, reveal_mode=is_reveal_active)
-    display_fixtures_visual(matches)
+    with profiled('render_players'):
+        display_player_status(state, matchday, reveal_mode=is_reveal_active)
+    with profiled('render_fixtures'):
+        display_fixtures_visual(matches)
+
+    finish_first_render(render_start)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,469 @@
+"""Deadline-rush load test for app.py.
+
+Simulates the hour before the deadline: N entrants arrive (Poisson, at a configurable
+rate), open the app, pick their name and submit a pick, all inside one process so
+they share the same Streamlit caches a single deployed instance would.
+
+Firestore is replaced by the in-memory stand-in in memstore.py (or a real Firestore
+emulator via --emulator) and football-data.org by a local stub server. The league is
+synthetic unless --snapshot seeds it from a file written by snapshot.py.
+
+    python loadtest.py --players 200 --rate 5
+    python loadtest.py --players 500 --rate 20 --spectators 0.5 --json report.json
+    python loadtest.py --snapshot backup.json.gz --gw 12
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import memstore
+import snapshot
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+TEAMS = [
+    "Arsenal FC", "Aston Villa FC", "AFC Bournemouth", "Brentford FC", "Brighton & Hove Albion FC",
+    "Burnley FC", "Chelsea FC", "Crystal Palace FC", "Everton FC", "Fulham FC",
+    "Leeds United FC", "Liverpool FC", "Manchester City FC", "Manchester United FC", "Newcastle United FC",
+    "Nottingham Forest FC", "Sunderland AFC", "Tottenham Hotspur FC", "West Ham United FC", "Wolverhampton Wanderers FC",
+]
+
+
+# --- STUB FOOTBALL-DATA SERVER ---
+def build_fixtures(gw, kickoff, finished):
+    """Ten matches; in finished gameweeks the home side always wins"""
+    rng = random.Random(gw)
+    teams = TEAMS[:]
+    rng.shuffle(teams)
+    matches = []
+    for i in range(10):
+        home, away = teams[2 * i], teams[2 * i + 1]
+        matches.append({
+            'matchday': gw,
+            'utcDate': (kickoff + timedelta(hours=i // 3)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            'status': 'FINISHED' if finished else 'SCHEDULED',
+            'homeTeam': {'name': home, 'crest': f"https://crests.invalid/{i}h.png"},
+            'awayTeam': {'name': away, 'crest': f"https://crests.invalid/{i}a.png"},
+            'score': {'fullTime': {'home': 2 if finished else None, 'away': 0 if finished else None}},
+        })
+    return matches
+
+
+class StubFootballAPI:
+    def __init__(self, gw, deadline_in):
+        now = datetime.utcnow()
+        # Deadline is an hour before first kickoff
+        kickoff = now + deadline_in + timedelta(hours=1)
+        self.fixtures = {g: build_fixtures(g, now - timedelta(days=7 * (gw - g)), True) for g in range(1, gw)}
+        self.fixtures[gw] = build_fixtures(gw, kickoff, False)
+        self.gw = gw
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v4"
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with api._lock:
+                    api.hits += 1
+                qs = parse_qs(urlparse(self.path).query)
+                if qs.get('status') == ['SCHEDULED']:
+                    matches = api.fixtures[api.gw]
+                else:
+                    matches = api.fixtures.get(int(qs.get('matchday', ['0'])[0]), [])
+                body = json.dumps({'matches': matches}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+
+# --- LEAGUE SEEDING ---
+def seed_league(db, players, gw, stub, layout):
+    """Everyone is active and has survived gw-1 with a distinct history of home winners"""
+    rng = random.Random(42)
+    used_before = {}
+    for i in range(players):
+        name = f"Player {i:04d}"
+        used = []
+        for g in range(max(1, gw - 4), gw):
+            winners = [m['homeTeam']['name'] for m in stub.fixtures[g] if m['homeTeam']['name'] not in used]
+            used.append(rng.choice(winners))
+        db.collection('players').document(name).set({'name': name, 'status': 'active', 'paid': i % 3 != 0, 'used_teams': used})
+        pick = {'team': used[-1], 'result': 'WIN'}
+        if layout != 'consolidated':
+            db.collection('picks').document(f"{name}_GW{gw - 1}").set({'user': name, 'matchday': gw - 1, **pick})
+        if layout != 'per_user':
+            # Same shard as app.pick_shard with the default PICK_SHARDS
+            shard = zlib.crc32(name.encode('utf-8')) % 8
+            db.collection('pick_sheets').document(f"GW{gw - 1}_{shard}").set(
+                {'matchday': gw - 1, 'shard': shard, 'picks': {name: pick}}, merge=True)
+        used_before[name] = used
+    db.collection('settings').document('config').set({'rollover_multiplier': 1})
+    return used_before
+
+
+def seed_from_snapshot(db, path):
+    """A real league: everyone still active gets to pick"""
+    snap = snapshot.load(path)
+    snapshot.seed(db, snap, snapshot.DEFAULT_LEAGUE_ID)
+    return {name: p.get('used_teams', []) for name, p in snap['collections']['players'].items()
+            if p.get('status') == 'active'}
+
+
+# --- SIMULATED SESSIONS ---
+def install_shared_runtime():
+    """AppTest swaps a mock Runtime singleton in and out around every run, which breaks
+    when several sessions run at once. Pin one shared mock runtime for the whole test."""
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    shared = mock.MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    try:
+        from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+        shared.dataframe_source_mgr = DataframeSourceManager()
+    except ImportError:
+        pass
+    # AppTest also compiles the script afresh on every run; concurrent compiles trip a
+    # CPython 3.11 ast thread-safety bug, so share one (locked) bytecode cache as the server does
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    script_cache = ScriptCache()
+    return [
+        mock.patch.object(Runtime, "instance", classmethod(lambda cls: shared)),
+        mock.patch.object(Runtime, "exists", classmethod(lambda cls: True)),
+        mock.patch("streamlit.testing.v1.local_script_runner.ScriptCache", return_value=script_cache),
+    ]
+
+
+def install_secrets(api_url, picks_layout, scheduler=False):
+    import streamlit as st
+    from streamlit.runtime.secrets import Secrets
+    secrets = Secrets()
+    state_dir = tempfile.mkdtemp(prefix="lms-loadtest-")
+    secrets._secrets = {
+        'FOOTBALL_API_KEY': "loadtest",
+        'FOOTBALL_API_URL': api_url,
+        'firebase': {'project_id': "loadtest"},
+        'PICKS_LAYOUT': picks_layout,
+        # Off by default: its settle/rollover jobs refetch fixtures and flush league caches mid-run,
+        # so the report would no longer measure user traffic alone
+        'SCHEDULER_ENABLED': scheduler,
+        # Keep the scheduler's progress and the quota tally out of the working tree
+        'SCHEDULER_STATE_FILE': os.path.join(state_dir, "scheduler.json"),
+        'QUOTA_STATE_FILE': os.path.join(state_dir, "quota.json"),
+    }
+    st.secrets = secrets
+
+
+def timed(samples, key, at):
+    start = time.perf_counter()
+    at.run()
+    samples.setdefault(key, []).append(time.perf_counter() - start)
+    from streamlit.runtime.state import SCRIPT_RUN_WITHOUT_ERRORS_KEY
+    try:
+        ran_ok = bool(at.session_state[SCRIPT_RUN_WITHOUT_ERRORS_KEY])
+    except KeyError:
+        ran_ok = False
+    if not ran_ok and not at.exception:
+        raise RuntimeError(f"{key} run did not complete")
+
+
+def open_pick_form(name, samples, timeout):
+    """Render the app and pick `name`; returns the AppTest with the pick form showing, or an outcome dict"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timed(samples, 'render', at)
+    if at.exception:
+        return {'name': name, 'errors': [e.value for e in at.exception]}
+    radio = at.radio(key="selected_radio_option")
+    if name not in radio.options:
+        return {'name': name, 'missing_from_list': True}
+    radio.set_value(name)
+    timed(samples, 'select_name', at)
+    if not at.selectbox:
+        return {'name': name, 'no_form': True, 'errors': [e.value for e in at.exception]}
+    return at
+
+
+def submit(at, team, samples):
+    at.selectbox[0].set_value(team)
+    next(b for b in at.button if b.label == "SUBMIT PICK").click()
+    timed(samples, 'submit', at)
+    return not (any("error occurred" in str(e.value) for e in at.error) or at.exception)
+
+
+def simulate_user(name, spectator, samples, outcomes, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    if spectator:
+        at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        timed(samples, 'render', at)
+        outcomes.append({'name': name, 'spectator': True, 'errors': [e.value for e in at.exception]})
+        return
+    at = open_pick_form(name, samples, timeout)
+    if isinstance(at, dict):
+        outcomes.append(at)
+        return
+    team = random.choice(at.selectbox[0].options)
+    ok = submit(at, team, samples)
+    outcomes.append({'name': name, 'team': team, 'submitted': ok, 'errors': [e.value for e in at.exception]})
+
+
+def simulate_double_submit(name, db, gw, layout, samples, outcomes, timeout):
+    """Two tabs open the pick form, then submit different teams at the same moment. The first pick to
+    land must stand: record what each tab saw stored straight after its submit, for check_league."""
+    tabs = [open_pick_form(name, samples, timeout) for _ in range(2)]
+    for tab in tabs:
+        if isinstance(tab, dict):
+            outcomes.append(tab)
+            return
+    options = tabs[0].selectbox[0].options
+    teams = random.sample(options, 2) if len(options) > 1 else options * 2
+    barrier = threading.Barrier(2)
+    seen, errors = [], []
+
+    def go(tab, team):
+        barrier.wait()
+        if submit(tab, team, samples):
+            seen.append(stored_pick(db, name, gw, layout))
+        errors.extend(e.value for e in tab.exception)
+
+    threads = [threading.Thread(target=go, args=(tab, team)) for tab, team in zip(tabs, teams)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    outcomes.append({'name': name, 'teams': teams, 'double': True, 'submitted': bool(seen), 'seen': seen, 'errors': errors})
+
+
+# --- CORRECTNESS CHECKS ---
+def read_picks(db, gw, layout):
+    """{user: [teams]} from the per-user docs and from the pick sheets"""
+    per_user, sheets = {}, {}
+    if layout != 'consolidated':
+        for doc in db.collection('picks').where('matchday', '==', gw).stream():
+            d = doc.to_dict()
+            per_user.setdefault(d.get('user'), []).append(d.get('team'))
+    if layout != 'per_user':
+        for doc in db.collection('pick_sheets').where('matchday', '==', gw).stream():
+            for user, d in doc.to_dict().get('picks', {}).items():
+                sheets.setdefault(user, []).append(d.get('team'))
+    return per_user, sheets
+
+
+def stored_pick(db, name, gw, layout):
+    """(team, timestamp) of a user's pick in the layout's source of truth"""
+    if layout == 'consolidated':
+        for doc in db.collection('pick_sheets').where('matchday', '==', gw).stream():
+            d = doc.to_dict().get('picks', {}).get(name)
+            if d: return d.get('team'), d.get('timestamp')
+        return None
+    doc = db.collection('picks').document(f"{name}_GW{gw}").get()
+    return (doc.get('team'), doc.get('timestamp')) if doc.exists else None
+
+
+def check_league(db, gw, used_before, outcomes, layout):
+    violations = []
+    per_user, sheets = read_picks(db, gw, layout)
+    picks_by_user = sheets if layout == 'consolidated' else per_user
+    if layout == 'dual' and per_user != sheets:
+        violations.append(f"pick sheets out of step with per-user picks: {len(sheets)} vs {len(per_user)} users")
+    players = {doc.id: doc.to_dict() for doc in db.collection('players').stream()}
+
+    for user, teams in picks_by_user.items():
+        for team in teams:
+            if team in used_before.get(user, []):
+                violations.append(f"{user} reused {team}")
+    for o in outcomes:
+        if o.get('missing_from_list'):
+            violations.append(f"{o['name']} was missing from the name list")
+        if o.get('double'):
+            violations.extend(check_double_submit(db, gw, layout, o, players))
+            continue
+        if not o.get('submitted'): continue
+        if o['team'] not in picks_by_user.get(o['name'], []):
+            violations.append(f"lost pick write: {o['name']} -> {o['team']}")
+        if o['team'] not in players.get(o['name'], {}).get('used_teams', []):
+            violations.append(f"lost used_teams write: {o['name']} -> {o['team']}")
+    return violations
+
+
+def check_double_submit(db, gw, layout, o, players):
+    """Exactly one of the two tabs' teams is stored and used, and it never changed after a tab saw it"""
+    violations = []
+    final = stored_pick(db, o['name'], gw, layout)
+    used = [t for t in set(o['teams']) if t in players.get(o['name'], {}).get('used_teams', [])]
+    if final is None:
+        if o['submitted']: violations.append(f"lost pick write (two tabs): {o['name']}")
+        return violations
+    if len(used) != 1 or final[0] not in used:
+        violations.append(f"two tabs left {o['name']} with pick {final[0]} and used_teams {used}")
+    for earlier in o['seen']:
+        if earlier != final:
+            violations.append(f"pick overwritten (two tabs): {o['name']} {earlier[0]} -> {final[0]}")
+    return violations
+
+
+def percentile(values, pct):
+    if not values: return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run(args):
+    stub = StubFootballAPI(args.gw, timedelta(minutes=args.deadline_in)).start()
+    if args.emulator:
+        from google.cloud import firestore
+        os.environ["FIRESTORE_EMULATOR_HOST"] = args.emulator
+        db = firestore.Client(project="loadtest")
+    else:
+        db = memstore.MemoryStore()
+    if args.snapshot:
+        used_before = seed_from_snapshot(db, args.snapshot)
+    else:
+        used_before = seed_league(db, args.players, args.gw, stub, args.picks_layout)
+    if not args.emulator:
+        db.reset_ops()
+
+    install_secrets(stub.url, args.picks_layout, args.scheduler)
+    from streamlit import config
+    config.set_option("global.appTest", True)
+    patches = install_shared_runtime() + [
+        mock.patch("google.cloud.firestore.Client.from_service_account_info", return_value=db),
+    ]
+    if not args.emulator:
+        patches.append(mock.patch("google.cloud.firestore.transactional", memstore.transactional))
+    for p in patches: p.start()
+
+    rng = random.Random(args.seed)
+    names = sorted(used_before)
+    rng.shuffle(names)
+    samples, outcomes, errors = {}, [], []
+
+    def session(name, kind):
+        try:
+            if kind == 'double':
+                simulate_double_submit(name, db, args.gw, args.picks_layout, samples, outcomes, args.timeout)
+            else:
+                simulate_user(name, kind == 'spectator', samples, outcomes, args.timeout)
+        except Exception as e:
+            errors.append(f"{name}: {e!r}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        next_arrival = started
+        for name in names:
+            next_arrival += rng.expovariate(args.rate)
+            time.sleep(max(0.0, next_arrival - time.perf_counter()))
+            roll = rng.random()
+            kind = 'spectator' if roll < args.spectators else 'double' if roll < args.spectators + args.double_submit else 'picker'
+            pool.submit(session, name, kind)
+    elapsed = time.perf_counter() - started
+
+    for p in patches: p.stop()
+    stub.stop()
+
+    report = {
+        'players': len(names),
+        'arrival_rate': args.rate,
+        'elapsed_s': round(elapsed, 2),
+        'sessions': len(outcomes),
+        'submitted': sum(1 for o in outcomes if o.get('submitted')),
+        'double_submits': sum(1 for o in outcomes if o.get('double')),
+        'latency_ms': {
+            key: {
+                'n': len(vals),
+                'p50': round(percentile(vals, 50) * 1000, 1),
+                'p99': round(percentile(vals, 99) * 1000, 1),
+                'mean': round(statistics.mean(vals) * 1000, 1),
+            }
+            for key, vals in samples.items()
+        },
+        'firestore_ops': None if args.emulator else dict(db.ops),
+        'api_requests': stub.hits,
+        'session_errors': errors + [f"{o['name']}: {e}" for o in outcomes for e in o.get('errors', [])],
+        'violations': check_league(db, args.gw, used_before, outcomes, args.picks_layout),
+    }
+    return report
+
+
+def print_report(report):
+    print(f"\n{report['players']} entrants @ {report['arrival_rate']}/s in {report['elapsed_s']}s "
+          f"({report['submitted']} picks submitted, {report['double_submits']} from two tabs at once)")
+    print(f"{'step':<12}{'n':>6}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for key in ('render', 'select_name', 'submit'):
+        lat = report['latency_ms'].get(key)
+        if lat: print(f"{key:<12}{lat['n']:>6}{lat['p50']:>10}{lat['p99']:>10}{lat['mean']:>10}")
+    ops = report['firestore_ops']
+    print(f"Firestore ops: {ops if ops is not None else 'n/a (emulator)'}")
+    print(f"football-data requests: {report['api_requests']}")
+    for heading, items in (("Session errors", report['session_errors']), ("VIOLATIONS", report['violations'])):
+        if items:
+            print(f"{heading} ({len(items)}):")
+            for item in items[:20]: print(f"  - {item}")
+    if not report['violations']:
+        print("No correctness violations.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=100, help="league size (default 100)")
+    parser.add_argument("--rate", type=float, default=5.0, help="mean arrivals per second (default 5)")
+    parser.add_argument("--concurrency", type=int, default=50, help="max simultaneous sessions (default 50)")
+    parser.add_argument("--spectators", type=float, default=0.0, help="fraction of arrivals who only view (default 0)")
+    parser.add_argument("--double-submit", type=float, default=0.1,
+                        help="fraction of arrivals who submit from two tabs at once (default 0.1)")
+    parser.add_argument("--gw", type=int, default=10, help="gameweek being picked (default 10)")
+    parser.add_argument("--deadline-in", type=int, default=30, help="minutes until the deadline (default 30)")
+    parser.add_argument("--timeout", type=float, default=60, help="per-run timeout in seconds (default 60)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--picks-layout", choices=["per_user", "dual", "consolidated"], default="per_user",
+                        help="how the app stores picks (default per_user)")
+    parser.add_argument("--scheduler", action="store_true", help="leave the app's background scheduler running during the run")
+    parser.add_argument("--snapshot", metavar="PATH", help="seed the league from a snapshot.py export instead of --players")
+    parser.add_argument("--emulator", metavar="HOST:PORT", help="use a Firestore emulator instead of the memory store")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    raise SystemExit(1 if report['violations'] else 0)
+
+
+if __name__ == "__main__":
+    main()
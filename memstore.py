@@ -0,0 +1,353 @@
+"""In-memory stand-in for the slice of google.cloud.firestore that app.py uses.
+
+Used by the load-test harness and for seeding from league snapshots, so the app
+can run end to end without a Firebase project. Every read, write and delete is
+counted so benchmarks can report Firestore operations.
+"""
+import copy
+import itertools
+import threading
+import uuid
+from datetime import datetime
+
+
+# --- SENTINELS & TRANSFORMS ---
+class _Sentinel:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"<{self.name}>"
+
+
+DELETE_FIELD = _Sentinel("DELETE_FIELD")
+SERVER_TIMESTAMP = _Sentinel("SERVER_TIMESTAMP")
+
+
+def _apply_transform(current, value):
+    """Resolve Firestore field transforms (ours or the real library's) against the stored value"""
+    kind = type(value).__name__
+    if value is SERVER_TIMESTAMP or kind == "Sentinel" and "SERVER_TIMESTAMP" in repr(value):
+        return datetime.now()
+    if kind == "ArrayUnion":
+        merged = list(current) if isinstance(current, list) else []
+        for v in value.values:
+            if v not in merged: merged.append(v)
+        return merged
+    if kind == "ArrayRemove":
+        existing = list(current) if isinstance(current, list) else []
+        return [v for v in existing if v not in value.values]
+    if kind == "Increment":
+        return (current if isinstance(current, (int, float)) else 0) + value.value
+    return copy.deepcopy(value)
+
+
+def _is_delete(value):
+    return value is DELETE_FIELD or (type(value).__name__ == "Sentinel" and "DELETE_FIELD" in repr(value))
+
+
+def _merge(target, data):
+    for key, value in data.items():
+        if _is_delete(value):
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = _apply_transform(target.get(key), value)
+
+
+def _set_path(target, dotted, value):
+    parts = dotted.split(".")
+    for part in parts[:-1]:
+        if not isinstance(target.get(part), dict): target[part] = {}
+        target = target[part]
+    if _is_delete(value):
+        target.pop(parts[-1], None)
+    else:
+        target[parts[-1]] = _apply_transform(target.get(parts[-1]), value)
+
+
+def _get_path(data, dotted):
+    for part in dotted.split("."):
+        if not isinstance(data, dict) or part not in data: return None
+        data = data[part]
+    return data
+
+
+class NotFound(Exception):
+    pass
+
+
+class Conflict(Exception):
+    pass
+
+
+# --- SNAPSHOTS & REFERENCES ---
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return copy.deepcopy(_get_path(self._data or {}, field))
+
+
+class DocumentReference:
+    def __init__(self, store, path):
+        self._store = store
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return CollectionReference(self._store, f"{self.path}/{name}")
+
+    def get(self, field_paths=None, transaction=None):
+        if transaction is not None:
+            return transaction.get(self)
+        return self._store._get(self)
+
+    def set(self, data, merge=False):
+        self._store._write(self, data, merge=merge)
+
+    def update(self, data):
+        self._store._update(self, data)
+
+    def delete(self):
+        self._store._delete(self)
+
+
+_OPS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a not in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+}
+
+
+class Query:
+    ASCENDING = "ASCENDING"
+    DESCENDING = "DESCENDING"
+
+    def __init__(self, store, path, filters=(), orders=(), limit=None, cursor=None):
+        self._store = store
+        self._path = path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._cursor = cursor
+
+    def _copy(self, **kw):
+        args = dict(filters=self._filters, orders=self._orders, limit=self._limit, cursor=self._cursor)
+        args.update(kw)
+        return Query(self._store, self._path, **args)
+
+    def where(self, field=None, op=None, value=None, filter=None):
+        if filter is not None:
+            field, op, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._copy(orders=self._orders + ((field, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, snapshot):
+        return self._copy(cursor=snapshot)
+
+    def _sort_key(self, snap):
+        key = []
+        for field, _ in self._orders:
+            value = snap.id if field == "__name__" else _get_path(snap._data, field)
+            key.append((value is None, value))
+        return tuple(key)
+
+    def stream(self, transaction=None):
+        return iter(self._store._query(self))
+
+    def get(self, transaction=None):
+        return list(self.stream())
+
+
+class CollectionReference(Query):
+    def __init__(self, store, path):
+        super().__init__(store, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, doc_id=None):
+        return DocumentReference(self._store, f"{self._path}/{doc_id or uuid.uuid4().hex[:20]}")
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return datetime.now(), ref
+
+
+# --- BATCHES & TRANSACTIONS ---
+class WriteBatch:
+    def __init__(self, store):
+        self._store = store
+        self._ops = []
+
+    def set(self, ref, data, merge=False):
+        self._ops.append(("set", ref, data, merge))
+
+    def update(self, ref, data):
+        self._ops.append(("update", ref, data, False))
+
+    def delete(self, ref):
+        self._ops.append(("delete", ref, None, False))
+
+    def commit(self):
+        with self._store._lock:
+            for op, ref, data, merge in self._ops:
+                if op == "set": self._store._write(ref, data, merge=merge)
+                elif op == "update": self._store._update(ref, data)
+                else: self._store._delete(ref)
+        self._ops = []
+
+    def __len__(self):
+        return len(self._ops)
+
+
+class Transaction(WriteBatch):
+    """Optimistic transaction: commit fails with Conflict if anything read has changed since"""
+
+    def __init__(self, store):
+        super().__init__(store)
+        self._read_versions = {}
+
+    def get(self, ref):
+        snap = self._store._get(ref)
+        self._read_versions[ref.path] = self._store._versions.get(ref.path, 0)
+        return snap
+
+    def commit(self):
+        with self._store._lock:
+            for path, version in self._read_versions.items():
+                if self._store._versions.get(path, 0) != version:
+                    self._ops = []
+                    raise Conflict(path)
+            super().commit()
+
+
+def transactional(fn, max_attempts=5):
+    """Stand-in for firestore.transactional: transactional(fn)(transaction, ...) commits, retrying fn on conflict"""
+    def run(transaction, *args, **kwargs):
+        for attempt in range(max_attempts):
+            transaction._ops, transaction._read_versions = [], {}
+            result = fn(transaction, *args, **kwargs)
+            try:
+                transaction.commit()
+                return result
+            except Conflict:
+                if attempt == max_attempts - 1: raise
+    return run
+
+
+def run_transaction(store, fn, *args, max_attempts=5):
+    """Run fn(transaction, ...) in a fresh transaction, retrying on conflict"""
+    return transactional(fn, max_attempts)(store.transaction(), *args)
+
+
+# --- THE STORE ---
+class MemoryStore:
+    def __init__(self):
+        self._docs = {}
+        self._versions = {}
+        self._lock = threading.RLock()
+        self._clock = itertools.count(1)
+        self.ops = {'reads': 0, 'writes': 0, 'deletes': 0}
+
+    def collection(self, name):
+        return CollectionReference(self, name)
+
+    def document(self, path):
+        return DocumentReference(self, path)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def transaction(self, **kwargs):
+        return Transaction(self)
+
+    def collections(self):
+        return [self.collection(n) for n in sorted({p.split("/", 1)[0] for p in self._docs})]
+
+    def reset_ops(self):
+        with self._lock:
+            self.ops = {'reads': 0, 'writes': 0, 'deletes': 0}
+
+    def _count(self, kind, n=1):
+        with self._lock:
+            self.ops[kind] += n
+
+    def _get(self, ref):
+        with self._lock:
+            self.ops['reads'] += 1
+            data = self._docs.get(ref.path)
+            return DocumentSnapshot(ref, copy.deepcopy(data))
+
+    def _write(self, ref, data, merge=False):
+        with self._lock:
+            self.ops['writes'] += 1
+            current = copy.deepcopy(self._docs.get(ref.path, {})) if merge else {}
+            _merge(current, data)
+            self._docs[ref.path] = current
+            self._versions[ref.path] = next(self._clock)
+
+    def _update(self, ref, data):
+        with self._lock:
+            if ref.path not in self._docs:
+                raise NotFound(f"No document to update: {ref.path}")
+            self.ops['writes'] += 1
+            current = copy.deepcopy(self._docs[ref.path])
+            for key, value in data.items():
+                _set_path(current, key, value)
+            self._docs[ref.path] = current
+            self._versions[ref.path] = next(self._clock)
+
+    def _delete(self, ref):
+        with self._lock:
+            self.ops['deletes'] += 1
+            self._docs.pop(ref.path, None)
+            self._versions[ref.path] = next(self._clock)
+
+    def _query(self, query):
+        prefix = query._path + "/"
+        with self._lock:
+            snaps = [
+                DocumentSnapshot(DocumentReference(self, path), copy.deepcopy(data))
+                for path, data in self._docs.items()
+                if path.startswith(prefix) and "/" not in path[len(prefix):]
+            ]
+        for field, op, value in query._filters:
+            snaps = [s for s in snaps if _OPS[op](s.id if field == "__name__" else _get_path(s._data, field), value)]
+        orders = query._orders or (("__name__", Query.ASCENDING),)
+        for field, direction in reversed(orders):
+            single = Query(self, query._path, orders=((field, direction),))
+            snaps.sort(key=single._sort_key, reverse=direction == Query.DESCENDING)
+        if query._cursor is not None:
+            cursor_key = query._copy(orders=orders)._sort_key(query._cursor)
+            ordered = query._copy(orders=orders)
+            keys = [ordered._sort_key(s) for s in snaps]
+            idx = next((i for i, k in enumerate(keys) if k == cursor_key), None)
+            snaps = snaps[idx + 1:] if idx is not None else snaps
+        if query._limit is not None:
+            snaps = snaps[:query._limit]
+        # Firestore bills a query that matches nothing as one read
+        self._count('reads', max(len(snaps), 1))
+        return snaps
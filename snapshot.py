@@ -0,0 +1,209 @@
+"""Export and import a league as one compressed, versioned snapshot file.
+
+Backs up players, picks, pick sheets, settings (and optionally logs) with paginated
+reads run in parallel across collections, and restores them with batched writes. The
+same file seeds a Firestore emulator or the in-memory store in memstore.py for tests
+and benchmarks.
+
+    python snapshot.py export backup.json.gz --league main --logs
+    python snapshot.py import backup.json.gz --dry-run
+    python snapshot.py import backup.json.gz --league test --prune
+    python snapshot.py import backup.json.gz --emulator localhost:8080
+
+Without --emulator or --credentials, the service account is read from the [firebase]
+table of .streamlit/secrets.toml, the same one the app uses.
+"""
+import argparse
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+SNAPSHOT_FORMAT = "lms-league-snapshot"
+SNAPSHOT_VERSION = 1
+DEFAULT_LEAGUE_ID = "main"
+COLLECTIONS = ('players', 'picks', 'pick_sheets', 'settings')
+OPTIONAL_COLLECTIONS = ('logs',)
+PAGE_SIZE = 500
+BATCH_SIZE = 400  # Firestore caps a batch at 500 writes
+WORKERS = 8
+
+
+# --- ENCODING ---
+# Snapshots are plain JSON; timestamps travel as {"__ts__": iso} so they restore as timestamps, not strings
+def encode(value):
+    if isinstance(value, datetime):
+        return {'__ts__': value.isoformat()}
+    if isinstance(value, dict):
+        return {k: encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode(v) for v in value]
+    return value
+
+def decode(value):
+    if isinstance(value, dict):
+        if set(value) == {'__ts__'}:
+            return datetime.fromisoformat(value['__ts__'])
+        return {k: decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    return value
+
+def dumps(snapshot):
+    return gzip.compress(json.dumps(snapshot, separators=(',', ':'), sort_keys=True).encode('utf-8'))
+
+def loads(data):
+    snapshot = json.loads(gzip.decompress(data).decode('utf-8'))
+    if snapshot.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError("Not a league snapshot")
+    if snapshot.get('version', 0) > SNAPSHOT_VERSION:
+        raise ValueError(f"Snapshot version {snapshot['version']} is newer than this tool ({SNAPSHOT_VERSION})")
+    return snapshot
+
+def save(snapshot, path):
+    with open(path, 'wb') as f:
+        f.write(dumps(snapshot))
+
+def load(path):
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+# --- EXPORT ---
+def collection_for(db, league_id):
+    """Same layout as app.league_col: the default league lives at the root, others under leagues/{id}"""
+    if league_id == DEFAULT_LEAGUE_ID:
+        return db.collection
+    return db.collection('leagues').document(league_id).collection
+
+def read_collection(col, page_size=PAGE_SIZE):
+    """All documents of one collection as {id: encoded data}, a page at a time in document-id order"""
+    docs = {}
+    query = col.order_by('__name__').limit(page_size)
+    while True:
+        page = list(query.stream())
+        for doc in page:
+            docs[doc.id] = encode(doc.to_dict())
+        if len(page) < page_size:
+            return docs
+        query = col.order_by('__name__').start_after(page[-1]).limit(page_size)
+
+def export_league(collection, league_id, include_logs=False, page_size=PAGE_SIZE):
+    """Snapshot a league. `collection` maps a collection name to a reference (app.league_col or collection_for)"""
+    names = COLLECTIONS + (OPTIONAL_COLLECTIONS if include_logs else ())
+    with ThreadPoolExecutor(max_workers=len(names)) as pool:
+        pages = dict(zip(names, pool.map(lambda name: read_collection(collection(name), page_size), names)))
+    return {
+        'format': SNAPSHOT_FORMAT,
+        'version': SNAPSHOT_VERSION,
+        'league': league_id,
+        'exported_at': datetime.now(timezone.utc).isoformat(),
+        'counts': {name: len(docs) for name, docs in pages.items()},
+        'collections': pages,
+    }
+
+
+# --- DIFF & RESTORE ---
+def diff(current, snapshot):
+    """What restoring `snapshot` over `current` (another snapshot of the target) would change, per collection"""
+    changes = {}
+    for name, docs in snapshot['collections'].items():
+        existing = current['collections'].get(name, {})
+        changes[name] = {
+            'added': sorted(set(docs) - set(existing)),
+            'changed': sorted(i for i in docs if i in existing and existing[i] != docs[i]),
+            'removed': sorted(set(existing) - set(docs)),
+        }
+    return changes
+
+def restore(db, collection, snapshot, changes=None, prune=False, batch_size=BATCH_SIZE):
+    """Write a snapshot back with batched writes, committed in parallel.
+    With `changes` (from diff) only added/changed documents are written and, with prune, removed ones deleted;
+    without it every document is written, which is what seeding an empty store wants."""
+    ops = []
+    for name, docs in snapshot['collections'].items():
+        col = collection(name)
+        if changes is None:
+            ids = list(docs)
+        else:
+            ids = changes[name]['added'] + changes[name]['changed']
+            if prune:
+                ops.extend(('delete', col.document(doc_id), None) for doc_id in changes[name]['removed'])
+        ops.extend(('set', col.document(doc_id), decode(docs[doc_id])) for doc_id in ids)
+
+    def commit(chunk):
+        batch = db.batch()
+        for op, ref, data in chunk:
+            if op == 'set': batch.set(ref, data)
+            else: batch.delete(ref)
+        batch.commit()
+        return len(chunk)
+
+    chunks = [ops[i:i + batch_size] for i in range(0, len(ops), batch_size)]
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        return sum(pool.map(commit, chunks))
+
+def seed(db, snapshot, league_id=None):
+    """Load a snapshot into an empty store (memstore.MemoryStore or an emulator), as league_id or its own league"""
+    return restore(db, collection_for(db, league_id or snapshot['league']), snapshot)
+
+
+# --- CLI ---
+def connect(args):
+    from google.cloud import firestore
+    if args.emulator:
+        os.environ["FIRESTORE_EMULATOR_HOST"] = args.emulator
+        return firestore.Client(project=args.project)
+    if args.credentials:
+        with open(args.credentials) as f:
+            return firestore.Client.from_service_account_info(json.load(f))
+    import tomllib
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml"), "rb") as f:
+        return firestore.Client.from_service_account_info(tomllib.load(f)["firebase"])
+
+def print_changes(changes):
+    for name, c in changes.items():
+        print(f"{name:<12} +{len(c['added'])} added  ~{len(c['changed'])} changed  -{len(c['removed'])} removed")
+        for kind, sign in (('added', '+'), ('changed', '~'), ('removed', '-')):
+            for doc_id in c[kind][:10]: print(f"    {sign} {doc_id}")
+            if len(c[kind]) > 10: print(f"    ... {len(c[kind]) - 10} more")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="snapshot file (.json.gz)")
+    parser.add_argument("--league", help=f"league to export from or import into (default: {DEFAULT_LEAGUE_ID} / the snapshot's own)")
+    parser.add_argument("--logs", action="store_true", help="export: include the logs collection")
+    parser.add_argument("--dry-run", action="store_true", help="import: only show what would change")
+    parser.add_argument("--prune", action="store_true", help="import: delete documents that are not in the snapshot")
+    parser.add_argument("--emulator", metavar="HOST:PORT", help="use a Firestore emulator")
+    parser.add_argument("--project", default="lms-local", help="emulator project id (default lms-local)")
+    parser.add_argument("--credentials", metavar="PATH", help="service account JSON file")
+    args = parser.parse_args()
+    db = connect(args)
+
+    if args.command == "export":
+        league_id = args.league or DEFAULT_LEAGUE_ID
+        snapshot = export_league(collection_for(db, league_id), league_id, include_logs=args.logs)
+        save(snapshot, args.path)
+        print(f"Exported {league_id}: {snapshot['counts']} -> {args.path} ({os.path.getsize(args.path):,} bytes)")
+        return
+
+    snapshot = load(args.path)
+    league_id = args.league or snapshot['league']
+    collection = collection_for(db, league_id)
+    current = export_league(collection, league_id, include_logs='logs' in snapshot['collections'])
+    changes = diff(current, snapshot)
+    if not args.prune:
+        for c in changes.values(): c['removed'] = []
+    print(f"Snapshot of {snapshot['league']} taken {snapshot['exported_at']} -> {league_id}")
+    print_changes(changes)
+    if args.dry_run:
+        return
+    written = restore(db, collection, snapshot, changes=changes, prune=args.prune)
+    print(f"Restored {written} documents.")
+
+
+if __name__ == "__main__":
+    main()